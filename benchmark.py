@@ -0,0 +1,746 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for Windows Temp File Cleaner
+Generates synthetic directory trees and compares traversal implementations
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from config import PathMapper, location_registry
+from records import FileEntry, ScanResult
+from utils import FileInventory, FileOperations, InventoryBudget, format_size
+
+
+# Throughput drop or peak memory growth (fraction) reported as regression by --compare
+REGRESSION_THRESHOLD = 0.2
+
+# Operations faster than this are too noisy for a throughput comparison
+MIN_COMPARE_SECONDS = 0.05
+
+# Size of the suite's MEMORY.DMP at --scale 1 (sparse, scaled linearly)
+MEMORY_DMP_SIZE = 256 * 1024 * 1024
+
+# Sparse file written to check that truncate() allocates no data blocks
+SPARSE_PROBE_SIZE = 64 * 1024 * 1024
+
+
+def generate_tree(root: str, file_count: int, files_per_dir: int = 1000,
+                  dirs_per_level: int = 10) -> int:
+    """
+    Generate a synthetic tree of small files
+    
+    Files are created sparse with os.truncate so generating a million of
+    them does not need gigabytes of real data.
+    
+    Args:
+        root: Directory to create the tree in
+        file_count: Total number of files to create
+        files_per_dir: Number of files per leaf directory
+        dirs_per_level: Fan-out of the intermediate directory levels
+    
+    Returns:
+        Expected total size in bytes
+    """
+    total_bytes = 0
+    leaf_count = max(1, (file_count + files_per_dir - 1) // files_per_dir)
+    created = 0
+    
+    for leaf in range(leaf_count):
+        # Spread leaves over a two-level hierarchy (root/aa/bb/leaf_n)
+        level1 = (leaf // dirs_per_level) % dirs_per_level
+        level2 = leaf % dirs_per_level
+        leaf_dir = os.path.join(root, f"d{level1:02d}", f"d{level2:02d}", f"leaf_{leaf}")
+        os.makedirs(leaf_dir, exist_ok=True)
+        
+        for i in range(min(files_per_dir, file_count - created)):
+            size = (created * 37) % 4096
+            with open(os.path.join(leaf_dir, f"f{i:05d}.tmp"), 'wb') as f:
+                f.truncate(size)
+            total_bytes += size
+            created += 1
+    
+    return total_bytes
+
+
+def generate_deep_tree(root: str, depth: int, fanout: int = 2, files_per_dir: int = 4) -> Tuple[int, int, int]:
+    """
+    Generate a deep, narrow tree (like Windows.old or $Windows.~BT)
+    
+    Every directory down to depth levels has fanout subdirectories and
+    files_per_dir sparse files, so directories outnumber files by far
+    more than in generate_tree.
+    
+    Returns:
+        Tuple of (total bytes, files, directories)
+    """
+    total_bytes = 0
+    files = 0
+    dirs = 0
+    stack = [(root, 0)]
+    while stack:
+        dirpath, level = stack.pop()
+        os.makedirs(dirpath, exist_ok=True)
+        dirs += 1
+        for i in range(files_per_dir):
+            size = (files * 37) % 4096
+            with open(os.path.join(dirpath, f"f{i}.tmp"), 'wb') as f:
+                f.truncate(size)
+            total_bytes += size
+            files += 1
+        if level < depth:
+            stack.extend((os.path.join(dirpath, f"d{i}"), level + 1) for i in range(fanout))
+    return total_bytes, files, dirs - 1
+
+
+def legacy_get_directory_size(path: str) -> Tuple[int, int, List[str]]:
+    """Reference implementation: os.walk plus one os.path.getsize per file"""
+    total_size = 0
+    file_count = 0
+    errors = []
+    
+    for dirpath, dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            file_path = os.path.join(dirpath, filename)
+            try:
+                total_size += os.path.getsize(file_path)
+                file_count += 1
+            except (OSError, PermissionError) as e:
+                errors.append(f"Fehler bei {file_path}: {str(e)}")
+    
+    return total_size, file_count, errors
+
+
+def legacy_delete_directory(path: str, max_retries: int = 3) -> Tuple[int, int, List[str]]:
+    """
+    Reference implementation: verbatim copy of the former FileOperations.delete_directory
+    
+    os.walk bottom-up, one os.path.getsize per file, one os.listdir
+    recheck before every os.rmdir.
+    
+    Args:
+        path: Directory path to delete
+        max_retries: Maximum number of retry attempts for locked files
+    
+    Returns:
+        Tuple of (deleted_files, freed_bytes, errors)
+    """
+    deleted_files = 0
+    freed_bytes = 0
+    errors = []
+    
+    if not os.path.exists(path):
+        errors.append(f"Pfad existiert nicht: {path}")
+        return deleted_files, freed_bytes, errors
+    
+    # Handle single file
+    if os.path.isfile(path):
+        try:
+            file_size = os.path.getsize(path)
+            os.remove(path)
+            deleted_files = 1
+            freed_bytes = file_size
+            return deleted_files, freed_bytes, errors
+        except Exception as e:
+            errors.append(f"Fehler bei {path}: {str(e)}")
+            return deleted_files, freed_bytes, errors
+    
+    # Handle directory
+    try:
+        for dirpath, dirnames, filenames in os.walk(path, topdown=False):
+            # Delete files
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                
+                for attempt in range(max_retries):
+                    try:
+                        file_size = os.path.getsize(file_path)
+                        os.remove(file_path)
+                        deleted_files += 1
+                        freed_bytes += file_size
+                        break  # Success, exit retry loop
+                    
+                    except PermissionError:
+                        if attempt < max_retries - 1:
+                            time.sleep(0.1)  # Wait a bit before retry
+                        else:
+                            errors.append(f"Zugriff verweigert: {file_path}")
+                    
+                    except FileNotFoundError:
+                        break  # File already deleted
+                    
+                    except Exception as e:
+                        if attempt < max_retries - 1:
+                            time.sleep(0.1)
+                        else:
+                            errors.append(f"Fehler bei {file_path}: {str(e)}")
+            
+            # Delete empty directories
+            for dirname in dirnames:
+                dir_path = os.path.join(dirpath, dirname)
+                try:
+                    if not os.listdir(dir_path):  # Only if empty
+                        os.rmdir(dir_path)
+                except (OSError, PermissionError):
+                    pass  # Ignore errors for directories
+    
+    except Exception as e:
+        errors.append(f"Fehler beim Durchlaufen von {path}: {str(e)}")
+    
+    return deleted_files, freed_bytes, errors
+
+
+# Called as func(path, counters); counters collects the DirEntry.stat calls count_os_calls cannot see
+IMPLEMENTATIONS: Dict[str, Callable[[str, List[int]], Tuple[int, int, List[str]]]] = {
+    'legacy_walk': lambda path, counters: legacy_get_directory_size(path),
+    'scandir': lambda path, counters: FileOperations.get_directory_size(path, counters=counters),
+    'scandir_x4': lambda path, counters: FileOperations.get_directory_size(path, workers=4, counters=counters),
+}
+
+DELETE_IMPLEMENTATIONS: Dict[str, Callable[[str, List[int]], Tuple[int, int, List[str]]]] = {
+    'legacy_walk': lambda path, counters: legacy_delete_directory(path),
+    'bulk': lambda path, counters: FileOperations.delete_directory(path, counters=counters),
+    'bulk_x4': lambda path, counters: FileOperations.delete_directory(path, workers=4, counters=counters),
+}
+
+
+def count_os_calls(func: Callable, path: str,
+                   names: Tuple[str, ...] = ('stat', 'lstat', 'scandir')) -> Tuple[tuple, Dict[str, int], float]:
+    """
+    Run func(path) while counting explicit calls of the given os functions
+    
+    DirEntry.stat() cannot be intercepted from Python. On Windows it is
+    served from the data FindNextFile already returned (no syscall), on
+    Linux it costs one stat per file.
+    
+    Returns:
+        Tuple of (result, call counts, elapsed seconds)
+    """
+    counts = dict.fromkeys(names, 0)
+    originals = {name: getattr(os, name) for name in counts}
+    
+    def make_wrapper(name):
+        original = originals[name]
+        
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return original(*args, **kwargs)
+        return wrapper
+    
+    for name in counts:
+        setattr(os, name, make_wrapper(name))
+    try:
+        start = time.perf_counter()
+        result = func(path)
+        elapsed = time.perf_counter() - start
+    finally:
+        for name, original in originals.items():
+            setattr(os, name, original)
+    
+    return result, counts, elapsed
+
+
+def run_strace(impl: str, path: str) -> str:
+    """Run one implementation under strace -c and return the syscall summary"""
+    cmd = ['strace', '-f', '-c', '-e', 'trace=%stat,getdents64,openat',
+           sys.executable, os.path.abspath(__file__), '--run-only', impl, path]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+    return result.stderr
+
+
+def bench_directory_size(args) -> None:
+    """Compare get_directory_size implementations on a generated tree"""
+    root = args.path or tempfile.mkdtemp(prefix='wtc_bench_')
+    created_here = args.path is None
+    
+    try:
+        if created_here or not os.listdir(root):
+            print(f"Erzeuge {args.files:,} Dateien in {root}...")
+            start = time.perf_counter()
+            expected = generate_tree(root, args.files)
+            print(f"  fertig in {time.perf_counter() - start:.1f}s "
+                  f"({format_size(expected)})\n")
+        
+        print(f"{'Implementierung':<14} {'Zeit':>9} {'stat':>10} {'lstat':>9} "
+              f"{'scandir':>11} {'Dateien':>10}")
+        print("-" * 68)
+        
+        results = {}
+        for name, func in IMPLEMENTATIONS.items():
+            counters = [0, 0]
+            result, counts, elapsed = count_os_calls(lambda path: func(path, counters), root)
+            results[name] = result[:2]
+            # os.path.getsize goes through os.stat, DirEntry.stat only shows up in counters
+            stat_calls = counts['stat'] + counters[1]
+            print(f"{name:<14} {elapsed:>8.2f}s {stat_calls:>10,} {counts['lstat']:>9,} "
+                  f"{counts['scandir']:>11,} {result[1]:>10,}")
+        print("\nstat zählt os.stat und DirEntry.stat; DirEntry.stat ist unter Linux ein "
+              "Syscall je Datei,\nunter Windows kommt es aus den Daten von FindNextFile "
+              "(--strace zählt echte Syscalls)")
+        
+        if len(set(results.values())) != 1:
+            print("\n❌ Ergebnisse weichen voneinander ab!")
+        else:
+            print("\n✓ Alle Implementierungen liefern identische Ergebnisse")
+        
+        if args.strace:
+            if not shutil.which('strace'):
+                print("\n⚠ strace nicht gefunden, Syscall-Zählung übersprungen")
+            else:
+                for name in IMPLEMENTATIONS:
+                    print(f"\n--- strace: {name} ---")
+                    print(run_strace(name, root))
+    finally:
+        if created_here and not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_delete(args) -> None:
+    """Compare delete_directory with the former implementation on a deep tree"""
+    base = tempfile.mkdtemp(prefix='wtc_bench_del_')
+    
+    try:
+        print(f"{'Implementierung':<16} {'Zeit':>9} {'stat':>9} {'listdir':>9} {'rmdir':>9} "
+              f"{'stat/V.':>8} {'listdir/V.':>11} {'rmdir/V.':>9} {'Dateien':>9} {'Rest':>5}")
+        print("-" * 102)
+        
+        results = {}
+        for name, func in DELETE_IMPLEMENTATIONS.items():
+            # Every implementation deletes its own fresh copy of the tree
+            root = os.path.join(base, name)
+            expected_bytes, expected_files, dir_count = generate_deep_tree(
+                root, args.depth, args.fanout, args.files_per_dir)
+            counters = [0, 0]
+            result, counts, elapsed = count_os_calls(
+                lambda path: func(path, counters), root, ('stat', 'listdir', 'rmdir'))
+            leftover_dirs = sum(len(dirs) for _, dirs, _ in os.walk(root))
+            leftover = leftover_dirs + sum(len(files) for _, _, files in os.walk(root))
+            deleted_dirs = max(dir_count - leftover_dirs, 1)
+            # os.path.getsize goes through os.stat, DirEntry.stat only shows up in counters
+            stat_calls = counts['stat'] + counters[1]
+            results[name] = result[:2]
+            print(f"{name:<16} {elapsed:>8.2f}s {stat_calls:>9,} {counts['listdir']:>9,} "
+                  f"{counts['rmdir']:>9,} {stat_calls / deleted_dirs:>8.2f} "
+                  f"{counts['listdir'] / deleted_dirs:>11.2f} {counts['rmdir'] / deleted_dirs:>9.2f} "
+                  f"{result[0]:>9,} {leftover:>5}")
+        
+        print(f"\nBaum: Tiefe {args.depth}, {dir_count:,} Verzeichnisse, "
+              f"{expected_files:,} Dateien ({format_size(expected_bytes)})")
+        print("/V. = Aufrufe je gelöschtem Verzeichnis")
+        if set(results.values()) != {(expected_files, expected_bytes)}:
+            print("❌ Gelöschte Dateien/Bytes weichen voneinander ab!")
+        else:
+            print("✓ Alle Implementierungen melden identische Dateien und Bytes")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def _inventory_path(i: int) -> str:
+    """Synthetic Windows-like file path for record benchmarks"""
+    return f"C:\\Users\\user\\AppData\\Local\\Temp\\d{i // 1000:04d}\\f{i:07d}.tmp"
+
+
+def _build_dicts(count: int) -> list:
+    return [{'path': _inventory_path(i), 'size': i * 37 % 4096, 'mtime_ns': 1_700_000_000_000_000_000 + i}
+            for i in range(count)]
+
+
+def _build_entries(count: int) -> list:
+    return [FileEntry(_inventory_path(i), i * 37 % 4096, 1_700_000_000_000_000_000 + i)
+            for i in range(count)]
+
+
+def _build_inventory(count: int) -> FileInventory:
+    # No spilling, so only the in-memory representation is measured
+    inventory = FileInventory(InventoryBudget(sys.maxsize))
+    batch = []
+    for i in range(count):
+        batch.append((_inventory_path(i), i * 37 % 4096, 1_700_000_000_000_000_000 + i))
+        if len(batch) == 1000:
+            inventory.add_files(batch)
+            batch = []
+    inventory.add_files(batch)
+    return inventory
+
+
+def _build_result_dicts(count: int) -> list:
+    return [{'name': f"Location {i}", 'category': 'system', 'priority': 2, 'paths': [],
+             'exists': True, 'size': i, 'files': i, 'reclaimable_size': i, 'reclaimable_files': i,
+             'errors': [], 'safe_delete': True, 'requires_admin': False, 'description': '',
+             'warning': '', 'method': 'simple_delete', 'service_to_stop': None, 'process_check': [],
+             'patterns': [], 'filter': None, 'shared_with': [], 'largest_files': [],
+             'largest_dirs': [], 'size_histogram': [], 'age_histogram': []}
+            for i in range(count)]
+
+
+def _build_results(count: int) -> list:
+    return [ScanResult(f"Location {i}", 'system', 2, []) for i in range(count)]
+
+
+def measure_memory(build: Callable[[int], object], count: int) -> Tuple[int, float]:
+    """
+    Build count records and measure the memory they keep alive
+    
+    Returns:
+        Tuple of (retained bytes, build seconds)
+    """
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        records = build(count)
+        elapsed = time.perf_counter() - start
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del records
+    return retained, elapsed
+
+
+def bench_record_memory(args) -> None:
+    """Compare the memory of dict records with the slotted/array representations"""
+    tables = [
+        (f"{args.records:,} Inventar-Einträge (path, size, mtime_ns)", args.records, [
+            ('dict', _build_dicts),
+            ('FileEntry (NamedTuple)', _build_entries),
+            ('FileInventory (arrays)', _build_inventory),
+        ]),
+        (f"{args.records // 100:,} Location-Ergebnisse", args.records // 100, [
+            ('dict', _build_result_dicts),
+            ('ScanResult (__slots__)', _build_results),
+        ]),
+    ]
+    
+    for title, count, variants in tables:
+        print(f"Speicherbedarf: {title}\n")
+        print(f"{'Darstellung':<26} {'Gesamt':>12} {'pro Eintrag':>12} {'Zeit':>9}")
+        print("-" * 62)
+        for name, build in variants:
+            retained, elapsed = measure_memory(build, count)
+            print(f"{name:<26} {format_size(retained):>12} {retained / max(1, count):>10.0f} B "
+                  f"{elapsed:>8.2f}s")
+        print()
+
+
+def _write_sparse(path: str, size: int) -> int:
+    """Create a sparse file of size bytes (no data blocks written)"""
+    with open(path, 'wb') as f:
+        f.truncate(size)
+    return size
+
+
+def sparse_files_supported(directory: str) -> bool:
+    """
+    Check that files extended with truncate() stay sparse in directory
+    
+    False where st_blocks is unavailable (Windows) or the probe file got
+    data blocks allocated (FAT, some tmpfs and overlay setups), so the
+    suite never fills a disk with gigabytes of zeros.
+    """
+    probe = os.path.join(directory, '.sparse_probe')
+    try:
+        _write_sparse(probe, SPARSE_PROBE_SIZE)
+        blocks = getattr(os.stat(probe), 'st_blocks', None)
+        return blocks is not None and blocks * 512 < SPARSE_PROBE_SIZE // 2
+    except OSError:
+        return False
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(probe)
+
+
+def shape_chrome_cache(root: str, scale: float) -> Tuple[int, int]:
+    """Chrome Cache: one flat Cache_Data directory of many small blobs plus index files"""
+    data_dir = os.path.join(root, 'Cache_Data')
+    os.makedirs(data_dir)
+    total_bytes = sum(_write_sparse(os.path.join(data_dir, name), 8192)
+                      for name in ('index', 'data_0', 'data_1', 'data_2', 'data_3'))
+    count = max(1, int(20000 * scale))
+    for i in range(count):
+        # 1-64 KB, deterministic
+        total_bytes += _write_sparse(os.path.join(data_dir, f"f_{i:06x}"), 1024 + (i * 7919) % 64512)
+    return total_bytes, count + 5
+
+
+def shape_windows_old(root: str, scale: float) -> Tuple[int, int]:
+    """Windows.old: a deep, narrow installation tree with a few files per directory"""
+    depth = 8 + max(0, int(scale * 4))
+    total_bytes, files, _ = generate_deep_tree(os.path.join(root, 'Windows'), depth,
+                                               fanout=2, files_per_dir=3)
+    return total_bytes, files
+
+
+def shape_memory_dmp(path: str, scale: float) -> Tuple[int, int]:
+    """MEMORY.DMP: a single large sparse file (the location path is the file itself)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    size = max(1024 * 1024, int(MEMORY_DMP_SIZE * scale))
+    return _write_sparse(path, size), 1
+
+
+def shape_etl_logs(root: str, scale: float) -> Tuple[int, int]:
+    """ETL logs: a handful of logger directories with large, rotated .etl files"""
+    total_bytes = 0
+    files = 0
+    per_dir = max(1, int(200 * scale))
+    for logger in ('Autologger', 'ShutdownLogger', 'SQM', 'Diagtrack'):
+        logger_dir = os.path.join(root, logger)
+        os.makedirs(logger_dir)
+        for i in range(per_dir):
+            size = (1 + (i * 13) % 64) * 1024 * 1024
+            total_bytes += _write_sparse(os.path.join(logger_dir, f"{logger}.{i:04d}.etl"), size)
+            files += 1
+    return total_bytes, files
+
+
+# Shape -> (config.py location it mimics, generator)
+SUITE_SHAPES: Dict[str, Tuple[str, Callable[[str, float], Tuple[int, int]]]] = {
+    'chrome_cache': ('Chrome Cache', shape_chrome_cache),
+    'windows_old': ('Windows.old', shape_windows_old),
+    'memory_dmp': ('Memory Dump Files', shape_memory_dmp),
+    'etl_logs': ('Diagnostic ETL Logs', shape_etl_logs),
+}
+
+# Shapes that reach gigabytes only thanks to sparse files, skipped without sparse support
+SPARSE_SHAPES = ('memory_dmp', 'etl_logs')
+
+
+def generate_shape(shape: str, mapper: PathMapper, scale: float) -> Tuple[str, int, int]:
+    """
+    Generate a shape at the path its location has under mapper's root
+    
+    Returns:
+        Tuple of (path, expected bytes, expected files)
+    """
+    location_name, generate = SUITE_SHAPES[shape]
+    path = location_registry.paths(location_registry.get(location_name), mapper)[0]
+    return (path,) + generate(path, scale)
+
+
+def measure_run(func: Callable[[], object]) -> Tuple[object, float]:
+    """Run func once untraced and return (result, wall seconds); see measure_peak for memory"""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def measure_peak(func: Callable[[], object]) -> int:
+    """Run func under tracemalloc and return its peak traced memory in bytes"""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _suite_entry(seconds: float, files: int, size: int, peak: int) -> dict:
+    return {
+        'seconds': round(seconds, 4),
+        'files': files,
+        'bytes': size,
+        'files_per_second': round(files / seconds, 1) if seconds > 0 else None,
+        'bytes_per_second': round(size / seconds, 1) if seconds > 0 else None,
+        'peak_bytes': peak,
+    }
+
+
+def run_suite(base: str, scale: float) -> dict:
+    """
+    Benchmark get_directory_size, delete_directory and scan_all_locations on all shapes
+    
+    Timings come from untraced runs; peak memory from a second run of the
+    same operation under tracemalloc (delete runs use a fresh tree each).
+    SPARSE_SHAPES are skipped if base cannot hold sparse files.
+    
+    Returns:
+        Baseline dictionary (see --baseline), skipped shapes in 'skipped'
+    """
+    from main import TempFileCleanerExtended
+    
+    shapes = list(SUITE_SHAPES)
+    skipped = []
+    if not sparse_files_supported(base):
+        skipped = [shape for shape in shapes if shape in SPARSE_SHAPES]
+        shapes = [shape for shape in shapes if shape not in SPARSE_SHAPES]
+    
+    results = {}
+    # The real config.py locations, with their paths mapped below base
+    scan_mapper = PathMapper(os.path.join(base, 'scan'))
+    for shape in shapes:
+        target, expected_bytes, expected_files = generate_shape(shape, scan_mapper, scale)
+        
+        (size, files, _), seconds = measure_run(lambda: FileOperations.get_directory_size(target))
+        if (size, files) != (expected_bytes, expected_files):
+            raise RuntimeError(f"{shape}: {files} Dateien/{size} Bytes statt "
+                               f"{expected_files}/{expected_bytes}")
+        peak = measure_peak(lambda: FileOperations.get_directory_size(target))
+        entry = {'get_directory_size': _suite_entry(seconds, files, size, peak)}
+        
+        # Delete a copy per run, the scan below still needs the original tree
+        copies = [generate_shape(shape, PathMapper(os.path.join(base, 'delete', run)), scale)[0]
+                  for run in ('time', 'peak')]
+        (deleted, freed, _), seconds = measure_run(lambda: FileOperations.delete_directory(copies[0]))
+        peak = measure_peak(lambda: FileOperations.delete_directory(copies[1]))
+        entry['delete_directory'] = _suite_entry(seconds, deleted, freed, peak)
+        results[shape] = entry
+    
+    locations = [location_registry.get(SUITE_SHAPES[shape][0]) for shape in shapes]
+    
+    def scan_all():
+        cleaner = TempFileCleanerExtended(use_cache=False, locations=locations,
+                                          path_mapper=scan_mapper)
+        cleaner.is_admin = True  # requires_admin locations are scanned like on an elevated run
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            cleaner.scan_all_locations()
+        return cleaner
+    
+    cleaner, seconds = measure_run(scan_all)
+    peak = measure_peak(scan_all)
+    results['all'] = {'scan_all_locations': _suite_entry(
+        seconds, cleaner.total_files, cleaner.total_size, peak)}
+    
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': scale,
+        'skipped': skipped,
+        'results': results,
+    }
+
+
+def compare_baseline(current: dict, baseline: dict,
+                     threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """
+    Compare a suite run with a saved baseline
+    
+    Returns:
+        One message per operation whose throughput dropped or whose peak
+        memory grew by more than threshold (throughput only for operations
+        running at least MIN_COMPARE_SECONDS)
+    """
+    regressions = []
+    for shape, operations in current['results'].items():
+        for operation, now in operations.items():
+            before = baseline.get('results', {}).get(shape, {}).get(operation)
+            if before is None:
+                continue
+            label = f"{shape}/{operation}"
+            timed = min(before['seconds'], now['seconds']) >= MIN_COMPARE_SECONDS
+            if timed and before['bytes_per_second'] and now['bytes_per_second'] and \
+                    now['bytes_per_second'] < before['bytes_per_second'] * (1 - threshold):
+                regressions.append(f"{label}: Durchsatz {format_size(now['bytes_per_second'])}/s "
+                                   f"statt {format_size(before['bytes_per_second'])}/s")
+            if before['peak_bytes'] and now['peak_bytes'] > before['peak_bytes'] * (1 + threshold):
+                regressions.append(f"{label}: Speicherspitze {format_size(now['peak_bytes'])} "
+                                   f"statt {format_size(before['peak_bytes'])}")
+    return regressions
+
+
+def bench_suite(args) -> int:
+    """Run the shape suite, print it and write/compare the JSON baseline"""
+    base = args.path or tempfile.mkdtemp(prefix='wtc_suite_')
+    os.makedirs(base, exist_ok=True)
+    
+    try:
+        baseline = run_suite(base, args.scale)
+    finally:
+        if not args.keep:
+            shutil.rmtree(base, ignore_errors=True)
+    
+    if baseline['skipped']:
+        print(f"⚠ Keine Sparse-Dateien unter {base}, übersprungen: {', '.join(baseline['skipped'])}\n")
+    print(f"{'Baum':<14} {'Operation':<20} {'Zeit':>8} {'Dateien':>9} {'Dateien/s':>11} "
+          f"{'Durchsatz':>12} {'Spitze':>10}")
+    print("-" * 90)
+    for shape, operations in baseline['results'].items():
+        for operation, entry in operations.items():
+            print(f"{shape:<14} {operation:<20} {entry['seconds']:>7.2f}s {entry['files']:>9,} "
+                  f"{entry['files_per_second'] or 0:>11,.0f} "
+                  f"{format_size(entry['bytes_per_second'] or 0) + '/s':>12} "
+                  f"{format_size(entry['peak_bytes']):>10}")
+    
+    if args.baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline gespeichert: {args.baseline}")
+    
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get('scale') != baseline['scale']:
+            print(f"\n⚠ Baseline wurde mit --scale {previous.get('scale')} erstellt, "
+                  f"dieser Lauf mit {baseline['scale']}: kein Vergleich")
+            return 2
+        regressions = compare_baseline(baseline, previous)
+        if regressions:
+            print(f"\n❌ {len(regressions)} Regression(en) gegenüber {args.compare}:")
+            for message in regressions:
+                print(f"  - {message}")
+            return 1
+        print(f"\n✓ Keine Regression gegenüber {args.compare}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks für den Temp File Cleaner")
+    parser.add_argument('--files', type=int, default=1_000_000,
+                        help="Anzahl zu erzeugender Dateien (Standard: 1.000.000)")
+    parser.add_argument('--path', help="Vorhandenen Baum verwenden statt einen neuen zu erzeugen")
+    parser.add_argument('--keep', action='store_true', help="Erzeugten Baum nicht löschen")
+    parser.add_argument('--strace', action='store_true',
+                        help="Zusätzlich echte Syscalls mit strace -c zählen (Linux)")
+    parser.add_argument('--memory', action='store_true',
+                        help="Speicherbedarf der Ergebnis-Datensätze statt der Traversierung messen")
+    parser.add_argument('--records', type=int, default=1_000_000,
+                        help="Anzahl Inventar-Einträge für --memory (Standard: 1.000.000)")
+    parser.add_argument('--delete', action='store_true',
+                        help="Löschen eines tiefen Baums statt der Traversierung messen")
+    parser.add_argument('--depth', type=int, default=12,
+                        help="Tiefe des Baums für --delete (Standard: 12)")
+    parser.add_argument('--fanout', type=int, default=2,
+                        help="Unterverzeichnisse pro Verzeichnis für --delete (Standard: 2)")
+    parser.add_argument('--files-per-dir', type=int, default=4,
+                        help="Dateien pro Verzeichnis für --delete (Standard: 4)")
+    parser.add_argument('--suite', action='store_true',
+                        help="Windows-ähnliche Bäume (Chrome Cache, Windows.old, MEMORY.DMP, ETL) messen")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Größenfaktor der Bäume für --suite (Standard: 1.0)")
+    parser.add_argument('--baseline', metavar='DATEI',
+                        help="Ergebnis von --suite als JSON-Baseline speichern")
+    parser.add_argument('--compare', metavar='DATEI',
+                        help="Ergebnis von --suite mit einer gespeicherten Baseline vergleichen")
+    parser.add_argument('--run-only', nargs=2, metavar=('IMPL', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.run_only:
+        impl, path = args.run_only
+        IMPLEMENTATIONS[impl](path, [0, 0])
+        return
+    
+    if args.memory:
+        bench_record_memory(args)
+        return
+    
+    if args.delete:
+        bench_delete(args)
+        return
+    
+    if args.suite:
+        sys.exit(bench_suite(args))
+    
+    bench_directory_size(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,9 @@ Configuration file for Windows Temp File Cleaner
 Defines all temporary file locations to be scanned and cleaned
 """
 
+import ntpath
 import os
+import re
 
 # Get current username for dynamic path expansion
 USERNAME = os.environ.get('USERNAME', 'User')
@@ -32,6 +34,34 @@ class Priority:
     NEVER = 99    # Never delete (view only)
 
 
+# ==================== PERFORMANCE SETTINGS ====================
+
+# Number of locations scanned concurrently (1 = sequential)
+DEFAULT_SCAN_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+
+# Worker threads used inside one location tree (Windows.old, WinSxS, ...)
+# Small trees stay serial, see utils.PARALLEL_WALK_MIN_DIRS
+DEFAULT_WALK_WORKERS = 4
+
+# Locations deleted concurrently, and at most this many per volume (st_dev)
+# so a hard disk is not thrashed while other volumes are kept busy
+DEFAULT_DELETE_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+DEFAULT_VOLUME_WORKERS = 2
+
+# Record scanned files so deletion can reuse the scan instead of walking again
+DEFAULT_KEEP_INVENTORY = True
+
+# Longest total wait (seconds) for retrying locked files after a delete walk,
+# see utils.RetryQueue
+DEFAULT_RETRY_WAIT = 10.0
+
+# Persistent per-directory scan cache (disable with --no-cache)
+SCAN_CACHE_PATH = os.path.join(
+    os.environ.get('LOCALAPPDATA') or os.path.expanduser('~'),
+    'win_temp_cleaner', 'scan_cache.json'
+)
+
+
 # ==================== HIGH PRIORITY LOCATIONS ====================
 
 HIGH_PRIORITY_LOCATIONS = [
@@ -87,8 +117,10 @@ HIGH_PRIORITY_LOCATIONS = [
         'name': 'Windows Error Reporting - ReportQueue',
         'paths': [
             r'C:\ProgramData\Microsoft\Windows\WER\ReportQueue',
-            os.path.expandvars(r'%LOCALAPPDATA%\Microsoft\Windows\WER\ReportQueue')
+            r'%LOCALAPPDATA%\Microsoft\Windows\WER\ReportQueue'
         ],
+        # Keep fresh reports for submission, large dumps can go anytime
+        'filter': {'min_age_days': 14, 'min_size_mb': 100, 'combine': 'any'},
         'category': LocationCategory.SYSTEM,
         'priority': Priority.HIGH,
         'safe_delete': True,
@@ -101,8 +133,9 @@ HIGH_PRIORITY_LOCATIONS = [
         'name': 'Windows Error Reporting - ReportArchive',
         'paths': [
             r'C:\ProgramData\Microsoft\Windows\WER\ReportArchive',
-            os.path.expandvars(r'%LOCALAPPDATA%\Microsoft\Windows\WER\ReportArchive')
+            r'%LOCALAPPDATA%\Microsoft\Windows\WER\ReportArchive'
         ],
+        'filter': {'min_age_days': 14, 'min_size_mb': 100, 'combine': 'any'},
         'category': LocationCategory.SYSTEM,
         'priority': Priority.HIGH,
         'safe_delete': True,
@@ -113,7 +146,7 @@ HIGH_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'Application Crash Dumps',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\CrashDumps'),
+        'path': r'%LOCALAPPDATA%\CrashDumps',
         'category': LocationCategory.SYSTEM,
         'priority': Priority.HIGH,
         'safe_delete': True,
@@ -219,6 +252,8 @@ MEDIUM_PRIORITY_LOCATIONS = [
     {
         'name': 'Windows Temp',
         'path': r'C:\Windows\Temp',
+        # Files still in use by running installers are usually recent
+        'filter': {'min_age_days': 7},
         'category': LocationCategory.SYSTEM,
         'priority': Priority.MEDIUM,
         'safe_delete': True,
@@ -229,7 +264,8 @@ MEDIUM_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'User Temp',
-        'path': os.path.expandvars(r'%TEMP%'),
+        'path': r'%TEMP%',
+        'filter': {'min_age_days': 2},
         'category': LocationCategory.SYSTEM,
         'priority': Priority.MEDIUM,
         'safe_delete': True,
@@ -265,7 +301,7 @@ MEDIUM_PRIORITY_LOCATIONS = [
     # Browser caches
     {
         'name': 'Chrome Cache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\Google\Chrome\User Data\Default\Cache'),
+        'path': r'%LOCALAPPDATA%\Google\Chrome\User Data\Default\Cache',
         'category': LocationCategory.BROWSER,
         'priority': Priority.MEDIUM,
         'safe_delete': True,
@@ -277,7 +313,7 @@ MEDIUM_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'Edge Cache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\Microsoft\Edge\User Data\Default\Cache'),
+        'path': r'%LOCALAPPDATA%\Microsoft\Edge\User Data\Default\Cache',
         'category': LocationCategory.BROWSER,
         'priority': Priority.MEDIUM,
         'safe_delete': True,
@@ -289,7 +325,7 @@ MEDIUM_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'Firefox Cache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\Mozilla\Firefox\Profiles'),
+        'path': r'%LOCALAPPDATA%\Mozilla\Firefox\Profiles',
         'category': LocationCategory.BROWSER,
         'priority': Priority.MEDIUM,
         'safe_delete': True,
@@ -304,9 +340,9 @@ MEDIUM_PRIORITY_LOCATIONS = [
     {
         'name': 'Discord Cache',
         'paths': [
-            os.path.expandvars(r'%APPDATA%\Discord\Cache'),
-            os.path.expandvars(r'%APPDATA%\Discord\Code Cache'),
-            os.path.expandvars(r'%APPDATA%\Discord\GPUCache'),
+            r'%APPDATA%\Discord\Cache',
+            r'%APPDATA%\Discord\Code Cache',
+            r'%APPDATA%\Discord\GPUCache',
         ],
         'category': LocationCategory.APPLICATION,
         'priority': Priority.MEDIUM,
@@ -320,14 +356,14 @@ MEDIUM_PRIORITY_LOCATIONS = [
     {
         'name': 'Microsoft Teams Cache (Classic)',
         'paths': [
-            os.path.expandvars(r'%APPDATA%\Microsoft\Teams\Application Cache'),
-            os.path.expandvars(r'%APPDATA%\Microsoft\Teams\Cache'),
-            os.path.expandvars(r'%APPDATA%\Microsoft\Teams\blob_storage'),
-            os.path.expandvars(r'%APPDATA%\Microsoft\Teams\databases'),
-            os.path.expandvars(r'%APPDATA%\Microsoft\Teams\GPUcache'),
-            os.path.expandvars(r'%APPDATA%\Microsoft\Teams\IndexedDB'),
-            os.path.expandvars(r'%APPDATA%\Microsoft\Teams\Local Storage'),
-            os.path.expandvars(r'%APPDATA%\Microsoft\Teams\tmp'),
+            r'%APPDATA%\Microsoft\Teams\Application Cache',
+            r'%APPDATA%\Microsoft\Teams\Cache',
+            r'%APPDATA%\Microsoft\Teams\blob_storage',
+            r'%APPDATA%\Microsoft\Teams\databases',
+            r'%APPDATA%\Microsoft\Teams\GPUcache',
+            r'%APPDATA%\Microsoft\Teams\IndexedDB',
+            r'%APPDATA%\Microsoft\Teams\Local Storage',
+            r'%APPDATA%\Microsoft\Teams\tmp',
         ],
         'category': LocationCategory.APPLICATION,
         'priority': Priority.MEDIUM,
@@ -341,8 +377,8 @@ MEDIUM_PRIORITY_LOCATIONS = [
     {
         'name': 'Slack Cache',
         'paths': [
-            os.path.expandvars(r'%APPDATA%\Slack\Cache'),
-            os.path.expandvars(r'%APPDATA%\Slack\Code Cache'),
+            r'%APPDATA%\Slack\Cache',
+            r'%APPDATA%\Slack\Code Cache',
         ],
         'category': LocationCategory.APPLICATION,
         'priority': Priority.MEDIUM,
@@ -355,7 +391,7 @@ MEDIUM_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'Spotify Cache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\Spotify\Data'),
+        'path': r'%LOCALAPPDATA%\Spotify\Data',
         'category': LocationCategory.APPLICATION,
         'priority': Priority.MEDIUM,
         'safe_delete': True,
@@ -369,8 +405,8 @@ MEDIUM_PRIORITY_LOCATIONS = [
     {
         'name': 'Zoom Cache',
         'paths': [
-            os.path.expandvars(r'%APPDATA%\Zoom\logs'),
-            os.path.expandvars(r'%APPDATA%\Zoom\cache'),
+            r'%APPDATA%\Zoom\logs',
+            r'%APPDATA%\Zoom\cache',
         ],
         'category': LocationCategory.APPLICATION,
         'priority': Priority.LOW,
@@ -384,7 +420,7 @@ MEDIUM_PRIORITY_LOCATIONS = [
     # Gaming
     {
         'name': 'NVIDIA DXCache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\NVIDIA\DXCache'),
+        'path': r'%LOCALAPPDATA%\NVIDIA\DXCache',
         'category': LocationCategory.GAMING,
         'priority': Priority.MEDIUM,
         'safe_delete': True,
@@ -395,7 +431,7 @@ MEDIUM_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'NVIDIA GLCache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\NVIDIA\GLCache'),
+        'path': r'%LOCALAPPDATA%\NVIDIA\GLCache',
         'category': LocationCategory.GAMING,
         'priority': Priority.MEDIUM,
         'safe_delete': True,
@@ -406,7 +442,7 @@ MEDIUM_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'AMD DXCache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\AMD\DxCache'),
+        'path': r'%LOCALAPPDATA%\AMD\DxCache',
         'category': LocationCategory.GAMING,
         'priority': Priority.MEDIUM,
         'safe_delete': True,
@@ -417,7 +453,7 @@ MEDIUM_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'AMD VkCache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\AMD\VkCache'),
+        'path': r'%LOCALAPPDATA%\AMD\VkCache',
         'category': LocationCategory.GAMING,
         'priority': Priority.MEDIUM,
         'safe_delete': True,
@@ -428,7 +464,7 @@ MEDIUM_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'Intel Shader Cache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\Intel\ShaderCache'),
+        'path': r'%LOCALAPPDATA%\Intel\ShaderCache',
         'category': LocationCategory.GAMING,
         'priority': Priority.MEDIUM,
         'safe_delete': True,
@@ -440,8 +476,8 @@ MEDIUM_PRIORITY_LOCATIONS = [
     {
         'name': 'DirectX Shader Cache',
         'paths': [
-            os.path.expandvars(r'%LOCALAPPDATA%\D3DSCache'),
-            os.path.expandvars(r'%LOCALAPPDATA%\Microsoft\D3DSCache'),
+            r'%LOCALAPPDATA%\D3DSCache',
+            r'%LOCALAPPDATA%\Microsoft\D3DSCache',
         ],
         'category': LocationCategory.GAMING,
         'priority': Priority.MEDIUM,
@@ -456,8 +492,8 @@ MEDIUM_PRIORITY_LOCATIONS = [
     {
         'name': 'npm Cache',
         'paths': [
-            os.path.expandvars(r'%APPDATA%\npm-cache'),
-            os.path.expandvars(r'%LOCALAPPDATA%\npm-cache'),
+            r'%APPDATA%\npm-cache',
+            r'%LOCALAPPDATA%\npm-cache',
         ],
         'category': LocationCategory.DEVELOPMENT,
         'priority': Priority.MEDIUM,
@@ -469,7 +505,7 @@ MEDIUM_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'pip Cache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\pip\cache'),
+        'path': r'%LOCALAPPDATA%\pip\cache',
         'category': LocationCategory.DEVELOPMENT,
         'priority': Priority.MEDIUM,
         'safe_delete': True,
@@ -486,7 +522,7 @@ MEDIUM_PRIORITY_LOCATIONS = [
 LOW_PRIORITY_LOCATIONS = [
     {
         'name': 'Windows Explorer Thumbnails',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\Microsoft\Windows\Explorer'),
+        'path': r'%LOCALAPPDATA%\Microsoft\Windows\Explorer',
         'category': LocationCategory.SYSTEM,
         'priority': Priority.LOW,
         'safe_delete': True,
@@ -497,7 +533,7 @@ LOW_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'IE Cache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\Microsoft\Windows\INetCache'),
+        'path': r'%LOCALAPPDATA%\Microsoft\Windows\INetCache',
         'category': LocationCategory.BROWSER,
         'priority': Priority.LOW,
         'safe_delete': True,
@@ -508,7 +544,7 @@ LOW_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'Icon Cache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\Microsoft\Windows\Explorer'),
+        'path': r'%LOCALAPPDATA%\Microsoft\Windows\Explorer',
         'patterns': ['iconcache_*.db'],
         'category': LocationCategory.SYSTEM,
         'priority': Priority.LOW,
@@ -538,9 +574,9 @@ LOW_PRIORITY_LOCATIONS = [
     {
         'name': 'Recent Documents',
         'paths': [
-            os.path.expandvars(r'%APPDATA%\Microsoft\Windows\Recent'),
-            os.path.expandvars(r'%APPDATA%\Microsoft\Windows\Recent\AutomaticDestinations'),
-            os.path.expandvars(r'%APPDATA%\Microsoft\Windows\Recent\CustomDestinations'),
+            r'%APPDATA%\Microsoft\Windows\Recent',
+            r'%APPDATA%\Microsoft\Windows\Recent\AutomaticDestinations',
+            r'%APPDATA%\Microsoft\Windows\Recent\CustomDestinations',
         ],
         'category': LocationCategory.SYSTEM,
         'priority': Priority.LOW,
@@ -552,7 +588,7 @@ LOW_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'Notification Cache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\Microsoft\Windows\Notifications'),
+        'path': r'%LOCALAPPDATA%\Microsoft\Windows\Notifications',
         'patterns': ['wpndatabase.db*'],
         'category': LocationCategory.SYSTEM,
         'priority': Priority.LOW,
@@ -564,7 +600,7 @@ LOW_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'Cryptnet URL Cache',
-        'path': os.path.expandvars(r'%USERPROFILE%\AppData\LocalLow\Microsoft\CryptnetUrlCache'),
+        'path': r'%USERPROFILE%\AppData\LocalLow\Microsoft\CryptnetUrlCache',
         'category': LocationCategory.SYSTEM,
         'priority': Priority.LOW,
         'safe_delete': True,
@@ -575,7 +611,7 @@ LOW_PRIORITY_LOCATIONS = [
     },
     {
         'name': 'Windows Store Cache',
-        'path': os.path.expandvars(r'%LOCALAPPDATA%\Packages\Microsoft.WindowsStore_8wekyb3d8bbwe\LocalCache'),
+        'path': r'%LOCALAPPDATA%\Packages\Microsoft.WindowsStore_8wekyb3d8bbwe\LocalCache',
         'category': LocationCategory.SYSTEM,
         'priority': Priority.LOW,
         'safe_delete': True,
@@ -617,28 +653,193 @@ VIEW_ONLY_LOCATIONS = [
 ]
 
 
+# ==================== PATH MAPPING ====================
+
+# Values of the Windows variables used by the location paths inside a
+# sandbox root (e.g. on a Linux build host that does not define them)
+SANDBOX_ENVIRONMENT = {
+    'SYSTEMROOT': r'C:\Windows',
+    'WINDIR': r'C:\Windows',
+    'PROGRAMDATA': r'C:\ProgramData',
+    'USERPROFILE': r'C:\Users\User',
+    'APPDATA': r'C:\Users\User\AppData\Roaming',
+    'LOCALAPPDATA': r'C:\Users\User\AppData\Local',
+    'TEMP': r'C:\Users\User\AppData\Local\Temp',
+    'TMP': r'C:\Users\User\AppData\Local\Temp',
+}
+
+# %NAME% (Windows), ${NAME} and $NAME
+_VARIABLE_PATTERN = re.compile(r'%([^%\\/]+)%|\$\{([^}]+)\}|\$(\w+)')
+
+
+class PathMapper:
+    """
+    Turns the raw location paths into paths on this machine
+    
+    Variables are expanded on every call (late binding), so environment
+    changes after import, per-run overrides and different mappers in one
+    process all take effect. Windows names are matched case-insensitively.
+    
+    With a root, every path is rewritten below it: C:\\Windows\\Temp becomes
+    <root>/C/Windows/Temp, and variables the overrides do not set come
+    from SANDBOX_ENVIRONMENT before the host environment. This lets the
+    full scan and delete pipeline run against a synthetic tree anywhere.
+    """
+    
+    def __init__(self, root: str = None, environment: dict = None):
+        self.root = os.path.abspath(root) if root else None
+        self.environment = {name.upper(): value for name, value in (environment or {}).items()}
+    
+    def lookup(self, name: str):
+        """Returns the value of a variable, or None if it is not set"""
+        key = name.upper()
+        if key in self.environment:
+            return self.environment[key]
+        if self.root is not None and key in SANDBOX_ENVIRONMENT:
+            return SANDBOX_ENVIRONMENT[key]
+        value = os.environ.get(name)
+        return value if value is not None else os.environ.get(key)
+    
+    def expand(self, raw: str) -> str:
+        """Expands the variables of a raw path (unknown variables stay as they are)"""
+        def replace(match):
+            value = self.lookup(match.group(1) or match.group(2) or match.group(3))
+            return match.group(0) if value is None else value
+        return _VARIABLE_PATTERN.sub(replace, raw)
+    
+    def map(self, path: str) -> str:
+        """Rewrites an expanded path below the root (unchanged without a root)"""
+        if self.root is None:
+            return path
+        drive, rest = ntpath.splitdrive(path)
+        # 'C:' -> 'C', UNC '\\\\server\\share' -> 'server', 'share'
+        parts = [part for part in re.split(r'[\\/:]+', drive) if part]
+        parts.extend(part for part in re.split(r'[\\/]+', rest) if part)
+        return os.path.join(self.root, *parts)
+    
+    def resolve(self, raw: str) -> str:
+        """Expands and maps a raw path"""
+        return self.map(self.expand(raw))
+
+
+# Real paths of this machine (no root, host environment)
+HOST_PATH_MAPPER = PathMapper()
+
+
+# ==================== LOCATION REGISTRY ====================
+
+class LocationRegistry:
+    """
+    Indexed view of the location configurations
+    
+    Built once; indexes by name, category, priority, method, service to
+    stop and process check make every lookup a dictionary access instead
+    of a scan over all locations. Paths keep their %VARIABLES% and are
+    only expanded when requested with paths(), by a PathMapper.
+    
+    Every call returns a new list, so callers may sort or filter it in
+    place; the location dictionaries themselves are shared.
+    """
+    
+    def __init__(self, locations: list):
+        self._locations = list(locations)
+        self._by_name = {}
+        self._by_category = {}
+        self._by_priority = {}
+        self._by_method = {}
+        self._by_service = {}
+        self._by_process = {}
+        self._safe = []
+        
+        for loc in self._locations:
+            if loc['name'].lower() in self._by_name:
+                raise ValueError(f"Doppelter Location-Name: {loc['name']}")
+            self._by_name[loc['name'].lower()] = loc
+            self._by_category.setdefault(loc.get('category'), []).append(loc)
+            self._by_priority.setdefault(loc.get('priority'), []).append(loc)
+            self._by_method.setdefault(loc.get('method', 'simple_delete'), []).append(loc)
+            if loc.get('service_to_stop'):
+                self._by_service.setdefault(loc['service_to_stop'].lower(), []).append(loc)
+            for process in loc.get('process_check', []):
+                self._by_process.setdefault(process.lower(), []).append(loc)
+            if loc.get('safe_delete', False):
+                self._safe.append(loc)
+    
+    def __len__(self) -> int:
+        return len(self._locations)
+    
+    def all(self) -> list:
+        """Returns all locations in priority order"""
+        return list(self._locations)
+    
+    def get(self, name: str):
+        """Returns the location with this name (case-insensitive), or None"""
+        return self._by_name.get(name.lower())
+    
+    def by_category(self, category: str) -> list:
+        """Returns all locations of a category"""
+        return list(self._by_category.get(category, ()))
+    
+    def by_priority(self, priority: int) -> list:
+        """Returns all locations of a priority level"""
+        return list(self._by_priority.get(priority, ()))
+    
+    def by_method(self, method: str) -> list:
+        """Returns all locations using a deletion method"""
+        return list(self._by_method.get(method, ()))
+    
+    def by_service(self, service: str) -> list:
+        """Returns all locations that stop this service (case-insensitive)"""
+        return list(self._by_service.get(service.lower(), ()))
+    
+    def by_process(self, process: str) -> list:
+        """Returns all locations that check for this process (case-insensitive)"""
+        return list(self._by_process.get(process.lower(), ()))
+    
+    def safe(self) -> list:
+        """Returns the locations that are safe to delete"""
+        return list(self._safe)
+    
+    def paths(self, location: dict, mapper: PathMapper = None) -> list:
+        """
+        Returns the expanded paths of a location ('path' first, then 'paths')
+        
+        Expanded on every call with mapper (default: HOST_PATH_MAPPER); any
+        location dictionary works, registered or not.
+        """
+        mapper = mapper or HOST_PATH_MAPPER
+        raw_paths = []
+        if 'path' in location:
+            raw_paths.append(location['path'])
+        raw_paths.extend(location.get('paths', []))
+        return [mapper.resolve(raw) for raw in raw_paths]
+
+
+location_registry = LocationRegistry(
+    HIGH_PRIORITY_LOCATIONS +
+    MEDIUM_PRIORITY_LOCATIONS +
+    LOW_PRIORITY_LOCATIONS +
+    VIEW_ONLY_LOCATIONS
+)
+
+
 # ==================== COMBINED LOCATIONS ====================
 
 def get_all_locations():
     """Returns all location configurations in priority order"""
-    return (
-        HIGH_PRIORITY_LOCATIONS +
-        MEDIUM_PRIORITY_LOCATIONS +
-        LOW_PRIORITY_LOCATIONS +
-        VIEW_ONLY_LOCATIONS
-    )
+    return location_registry.all()
 
 
 def get_locations_by_category(category):
     """Returns all locations for a specific category"""
-    return [loc for loc in get_all_locations() if loc['category'] == category]
+    return location_registry.by_category(category)
 
 
 def get_locations_by_priority(priority):
     """Returns all locations for a specific priority level"""
-    return [loc for loc in get_all_locations() if loc.get('priority') == priority]
+    return location_registry.by_priority(priority)
 
 
 def get_safe_locations():
     """Returns only locations that are safe to delete"""
-    return [loc for loc in get_all_locations() if loc.get('safe_delete', False)]
\ No newline at end of file
+    return location_registry.safe()
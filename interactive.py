@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Interactive front end for Windows Temp File Cleaner
+Prompts, confirmation dialogs and the interactive cleanup menu.
+Only imported for interactive runs; batch runs (main.py --batch) never load it.
+"""
+
+import argparse
+
+from config import Priority
+from utils import format_size
+
+
+def confirm_action(prompt: str, default: bool = False) -> bool:
+    """
+    Ask user for confirmation
+    
+    Args:
+        prompt: Question to ask
+        default: Default answer if user just presses Enter
+    
+    Returns:
+        True if user confirms, False otherwise
+    """
+    yes_choices = ['ja', 'j', 'yes', 'y']
+    no_choices = ['nein', 'n', 'no']
+    
+    default_str = " [Ja/nein]" if default else " [ja/Nein]"
+    
+    while True:
+        response = input(prompt + default_str + ": ").strip().lower()
+        
+        if response == '':
+            return default
+        elif response in yes_choices:
+            return True
+        elif response in no_choices:
+            return False
+        else:
+            print("Bitte 'ja' oder 'nein' eingeben.")
+
+
+def interactive_cleanup(cleaner):
+    """Interactive cleanup interface for a scanned TempFileCleanerExtended"""
+    print("\n" + "=" * 70)
+    print("INTERAKTIVE BEREINIGUNG")
+    print("=" * 70)
+    print()
+    
+    # Get deletable locations sorted by size
+    deletable = sorted(
+        [(name, r) for name, r in cleaner.scan_results.items() 
+         if r['exists'] and r['safe_delete']],
+        key=lambda x: x[1]['reclaimable_size'],
+        reverse=True
+    )
+    
+    if not deletable:
+        print("Keine löschbaren Locations gefunden.")
+        return
+    
+    print(f"Gefunden: {len(deletable)} löschbare Locations\n")
+    
+    # Show by priority
+    for priority in [Priority.CRITICAL, Priority.HIGH, Priority.MEDIUM, Priority.LOW]:
+        priority_locs = [(n, r) for n, r in deletable if r['priority'] == priority]
+        
+        if not priority_locs:
+            continue
+        
+        priority_names = {
+            Priority.CRITICAL: "🔴 KRITISCH",
+            Priority.HIGH: "🟠 HOCH",
+            Priority.MEDIUM: "🟡 MITTEL",
+            Priority.LOW: "🟢 NIEDRIG",
+        }
+        
+        print(f"\n{priority_names.get(priority, 'UNKNOWN')}:")
+        print("-" * 70)
+        
+        for name, result in priority_locs:
+            idx = deletable.index((name, result)) + 1
+            print(f"{idx:2d}. {name}")
+            print(f"    Größe: {format_size(result['size'])}, Dateien: {result['files']}")
+            if result['filter']:
+                print(f"    Freigebbar (Filter): {format_size(result['reclaimable_size'])}, "
+                      f"Dateien: {result['reclaimable_files']}")
+            print(f"    Pfad: {result['paths'][0]}")
+            if result['warning']:
+                print(f"    ⚠ {result['warning']}")
+            if result['process_check']:
+                print(f"    ⚙ Prüft Prozesse: {', '.join(result['process_check'])}")
+            print()
+    
+    print("\nOptionen:")
+    print("  a           - Alle SICHEREN Locations löschen")
+    print("  h           - Nur HOHE Priorität löschen")
+    print("  1,2,3       - Spezifische Nummern löschen (kommagetrennt)")
+    print("  q           - Abbrechen")
+    print()
+    
+    choice = input("Deine Wahl: ").strip().lower()
+    
+    if choice == 'q':
+        print("Abgebrochen.")
+        return
+    
+    locations_to_delete = []
+    
+    if choice == 'a':
+        # All safe locations
+        locations_to_delete = [name for name, _ in deletable]
+    elif choice == 'h':
+        # Only high priority
+        locations_to_delete = [name for name, r in deletable 
+                              if r['priority'] in [Priority.HIGH, Priority.CRITICAL]]
+    else:
+        # Specific indices
+        try:
+            indices = [int(x.strip()) for x in choice.split(',')]
+            locations_to_delete = [deletable[i-1][0] for i in indices 
+                                  if 1 <= i <= len(deletable)]
+        except (ValueError, IndexError):
+            print("❌ Ungültige Eingabe!")
+            return
+    
+    if not locations_to_delete:
+        print("Keine Locations ausgewählt.")
+        return
+    
+    # Calculate total size
+    total_size_to_delete = sum(
+        cleaner.scan_results[loc]['reclaimable_size'] for loc in locations_to_delete
+    )
+    
+    # Show summary and confirm
+    print(f"\n{'='*70}")
+    print(f"WARNUNG: Du bist dabei {format_size(total_size_to_delete)} zu löschen!")
+    print(f"{'='*70}")
+    print(f"\nAusgewählte Locations ({len(locations_to_delete)}):")
+    for loc in locations_to_delete:
+        result = cleaner.scan_results[loc]
+        print(f"  • {loc} - {format_size(result['reclaimable_size'])}")
+    print()
+    
+    if not confirm_action("Wirklich löschen?", default=False):
+        print("❌ Abgebrochen.")
+        return
+    
+    # Perform deletion
+    print(f"\n{'='*70}")
+    print("LÖSCHE DATEIEN...")
+    print(f"{'='*70}\n")
+    
+    total_deleted_files = 0
+    total_freed_bytes = 0
+    
+    for loc, (success, message, deleted, freed) in cleaner.delete_locations(locations_to_delete):
+        print(f"Bearbeite: {loc}...")
+        
+        if success:
+            print(f"  {message}")
+            total_deleted_files += deleted
+            total_freed_bytes += freed
+        else:
+            print(f"  ❌ Fehler: {message}")
+        print()
+    
+    print("=" * 70)
+    print("BEREINIGUNG ABGESCHLOSSEN")
+    print("=" * 70)
+    print(f"\nGesamt gelöscht: {total_deleted_files:,} Dateien")
+    print(f"Gesamt freigegeben: {format_size(total_freed_bytes)}")
+    print()
+
+
+def run_interactive(cleaner, args: argparse.Namespace) -> int:
+    """
+    Scan, report and offer an interactive cleanup
+    
+    Args:
+        cleaner: TempFileCleanerExtended to run
+        args: Parsed command line arguments (see main.parse_args)
+        
+    Returns:
+        Process exit code
+    """
+    # Print header
+    cleaner.print_header()
+    
+    # Scan all locations
+    cleaner.scan_all_locations()
+    
+    # Create report
+    print("Erstelle erweiterten Markdown-Report...")
+    report_path = cleaner.create_markdown_report()
+    print(f"✓ Report erstellt: {report_path}\n")
+    
+    if args.export_jsonl:
+        count = cleaner.export_jsonl(args.export_jsonl)
+        print(f"✓ JSON Lines Export: {args.export_jsonl} ({count} Locations)\n")
+    
+    if args.export_inventory:
+        count = cleaner.export_inventory(args.export_inventory)
+        print(f"✓ Inventar-Export: {args.export_inventory} ({count:,} Dateien)\n")
+    
+    # Offer cleanup
+    if cleaner.total_size > 0:
+        if confirm_action("Möchtest du jetzt Dateien löschen?", default=False):
+            interactive_cleanup(cleaner)
+        else:
+            print("\n✓ Keine Bereinigung durchgeführt.")
+            print("  Du kannst den Report jederzeit einsehen für Details.")
+    else:
+        print("ℹ Keine temporären Dateien zum Löschen gefunden.")
+    
+    print(f"\n✓ Fertig! Report: {report_path}")
+    return 0
@@ -7,35 +7,79 @@ Author: https://github.com/towelie8
 Version: 2.0
 """
 
+import argparse
+import contextlib
 import datetime
+import json
 import getpass
 import os
+import socket
 import sys
-from typing import List, Tuple, Dict, Optional
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, List, Tuple, Dict, Optional
 
 # Import configuration and utilities
-from config import get_all_locations, get_safe_locations, Priority
+from config import (
+    location_registry, LocationRegistry, PathMapper, HOST_PATH_MAPPER, Priority,
+    DEFAULT_SCAN_WORKERS, DEFAULT_WALK_WORKERS, DEFAULT_KEEP_INVENTORY, DEFAULT_RETRY_WAIT,
+    DEFAULT_DELETE_WORKERS, DEFAULT_VOLUME_WORKERS, SCAN_CACHE_PATH
+)
+from metrics import metrics, GLOBAL_LOCATION
+from records import ErrorCollector, ScanResult
+from report import ReportAggregator, REPORT_BUFFER_SIZE, write_jsonl, write_inventory_binary
 from utils import (
     ProcessManager, ServiceManager, PermissionManager, FileOperations,
-    DISMOperations, format_size, confirm_action
+    DISMOperations, FileInventory, LargestEntries, FileHistogram, ScanCache,
+    PatternMatcher, FileFilter, OverlapIndex, VolumeLimiter, format_size
 )
 
 
 class TempFileCleanerExtended:
     """Extended temp file cleaner with support for 50+ locations"""
     
-    def __init__(self):
+    def __init__(self, scan_workers: int = DEFAULT_SCAN_WORKERS,
+                 walk_workers: int = DEFAULT_WALK_WORKERS,
+                 keep_inventory: bool = DEFAULT_KEEP_INVENTORY,
+                 use_cache: bool = True, locations: Optional[List[dict]] = None,
+                 retry_wait: float = DEFAULT_RETRY_WAIT,
+                 delete_workers: int = DEFAULT_DELETE_WORKERS,
+                 volume_workers: int = DEFAULT_VOLUME_WORKERS,
+                 path_mapper: Optional[PathMapper] = None):
         self.username = getpass.getuser()
         self.scan_results = {}
         self.timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.locations = get_all_locations()
+        # Expands (and optionally sandboxes) the location paths, see config.PathMapper
+        self.path_mapper = path_mapper or HOST_PATH_MAPPER
+        all_locations = location_registry.all()
+        # Scan only a selection, but keep overlaps with all locations so
+        # files owned by an unselected nested location stay untouched
+        self.locations = all_locations if locations is None else locations
         self.is_admin = PermissionManager.is_admin()
+        self.scan_workers = max(1, scan_workers)
+        self.walk_workers = max(1, walk_workers)
+        self.keep_inventory = keep_inventory
+        self.retry_wait = max(0.0, retry_wait)
+        self.delete_workers = max(1, delete_workers)
+        self.volume_workers = max(1, volume_workers)
+        self.inventories = {}  # location name -> FileInventory from the last scan
+        self.scan_cache = ScanCache.load(SCAN_CACHE_PATH) if use_cache else None
+        # Selected locations replace the registry entry of the same name
+        # (e.g. benchmark trees with overridden paths)
+        indexed = {loc['name']: loc for loc in all_locations}
+        indexed.update((loc['name'], loc) for loc in self.locations)
+        self.overlap_index = OverlapIndex([
+            (loc['name'], self.expand_location_paths(loc), self.get_matcher(loc))
+            for loc in indexed.values()
+        ])
         
         # Statistics
+        self.report = ReportAggregator()
         self.total_scanned = 0
         self.total_size = 0
         self.total_files = 0
-        
+    
     def print_header(self):
         """Print application header"""
         print("""
@@ -57,55 +101,44 @@ class TempFileCleanerExtended:
         
         Args:
             location: Location configuration dictionary
-            
+        
         Returns:
             List of actual paths to scan
         """
-        paths = []
-        
-        # Handle single path
-        if 'path' in location:
-            path = os.path.expandvars(location['path'])
-            paths.append(path)
-        
-        # Handle multiple paths
-        if 'paths' in location:
-            for p in location['paths']:
-                path = os.path.expandvars(p)
-                paths.append(path)
-        
-        return paths
+        # Expanded now, not at import, so --root/--env and environment changes apply
+        return location_registry.paths(location, self.path_mapper)
+    
+    @staticmethod
+    def get_matcher(location: dict) -> Optional[PatternMatcher]:
+        """Get the compiled matcher for a location's (or scan result's) patterns (None = all files)"""
+        if not location.get('patterns'):
+            return None
+        return PatternMatcher.for_patterns(tuple(location['patterns']))
     
-    def scan_location(self, location: dict) -> dict:
+    @staticmethod
+    def get_predicate(location: dict) -> Optional[FileFilter]:
+        """Get the file filter for a location's (or scan result's) 'filter' (None = all files)"""
+        if not location.get('filter'):
+            return None
+        return FileFilter.for_config(location['filter'])
+    
+    def scan_location(self, location: dict) -> ScanResult:
         """
         Scan a single location
         
         Args:
             location: Location configuration
-            
+        
         Returns:
-            Scan result dictionary
+            Scan result (slotted record with dict-style access)
         """
         name = location['name']
-        paths = self.expand_location_paths(location)
-        
-        result = {
-            'name': name,
-            'category': location.get('category', 'unknown'),
-            'priority': location.get('priority', Priority.LOW),
-            'paths': paths,
-            'exists': False,
-            'size': 0,
-            'files': 0,
-            'errors': [],
-            'safe_delete': location.get('safe_delete', False),
-            'requires_admin': location.get('requires_admin', False),
-            'description': location.get('description', ''),
-            'warning': location.get('warning', ''),
-            'method': location.get('method', 'simple_delete'),
-            'service_to_stop': location.get('service_to_stop'),
-            'process_check': location.get('process_check', []),
-        }
+        with metrics.phase(name, 'expand'):
+            paths = self.overlap_index.paths_for(name, self.expand_location_paths(location))
+        
+        result = ScanResult.from_location(
+            location, paths, sorted(self.overlap_index.shared.get(name, ()))
+        )
         
         # Check if requires admin and we don't have it
         if location.get('requires_admin') and not self.is_admin:
@@ -115,53 +148,122 @@ class TempFileCleanerExtended:
         # Scan all paths for this location
         total_size = 0
         total_files = 0
-        all_errors = []
+        all_errors = ErrorCollector()
         found_any = False
         
-        for path in paths:
-            if os.path.exists(path):
-                found_any = True
-                size, files, errors = FileOperations.get_directory_size(path)
-                total_size += size
-                total_files += files
-                all_errors.extend(errors)
+        matcher = self.get_matcher(result)
+        top = LargestEntries()
+        histogram = FileHistogram()
+        predicate = self.get_predicate(result)
+        reclaimable = [0, 0]
+        counters = [0, 0]  # directories, stat calls
+        
+        # Only deletable locations need an inventory for the delete phase
+        inventory = None
+        if self.keep_inventory and result['safe_delete']:
+            inventory = FileInventory()
+        
+        with metrics.phase(name, 'traverse') as phase:
+            for path in paths:
+                if os.path.exists(path):
+                    found_any = True
+                    size, files, errors = FileOperations.get_directory_size(
+                        path, workers=self.walk_workers, inventory=inventory,
+                        cache=self.scan_cache, matcher=matcher,
+                        exclusions=self.overlap_index.exclusions_for(name, path),
+                        top=top, histogram=histogram, predicate=predicate,
+                        reclaimable=reclaimable, counters=counters
+                    )
+                    total_size += size
+                    total_files += files
+                    all_errors.extend(errors)
+            phase.add(dirs=counters[0], files=total_files, stat_calls=counters[1],
+                      bytes=total_size, errors=len(all_errors))
+        
+        if inventory is not None:
+            previous = self.inventories.pop(name, None)
+            if previous is not None:
+                previous.close()
+            if found_any:
+                self.inventories[name] = inventory
         
         result['exists'] = found_any
         result['size'] = total_size
         result['files'] = total_files
+        if predicate is not None:
+            result['reclaimable_size'], result['reclaimable_files'] = reclaimable
+        else:
+            result['reclaimable_size'], result['reclaimable_files'] = total_size, total_files
         result['errors'] = all_errors
+        result['largest_files'] = top.largest_files()
+        result['largest_dirs'] = top.largest_dirs()
+        result['size_histogram'] = histogram.size_distribution()
+        result['age_histogram'] = histogram.age_distribution()
         
         return result
     
-    def scan_all_locations(self):
-        """Scan all configured locations"""
+    def scan_all_locations(self, workers: Optional[int] = None):
+        """
+        Scan all configured locations
+        
+        Args:
+            workers: Number of locations scanned concurrently (default: self.scan_workers).
+                     Results are still printed and summed in configuration order,
+                     so output and totals match a sequential run.
+        """
+        workers = max(1, workers or self.scan_workers)
+        
+        # A rescan replaces the previous results instead of adding to them
+        self.report = ReportAggregator()
+        self.total_scanned = 0
+        self.total_size = 0
+        self.total_files = 0
+        
         print("=" * 70)
         print("STARTE ERWEITERTEN SCAN")
         print(f"Scanne {len(self.locations)} Locations...")
+        if workers > 1:
+            print(f"Parallele Scans: {workers}")
         print("=" * 70)
         print()
         
-        for i, location in enumerate(self.locations, 1):
-            name = location['name']
-            print(f"[{i}/{len(self.locations)}] Scanne: {name}...", end='', flush=True)
+        executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            # executor.map yields in submission order; plain map scans lazily one by one
+            mapper = executor.map if executor else map
+            results = mapper(self.scan_location, self.locations)
             
-            result = self.scan_location(location)
-            self.scan_results[name] = result
-            
-            if result['exists']:
-                print(f" ✓")
-                print(f"    Größe: {format_size(result['size'])}, Dateien: {result['files']}")
-                if result['errors'] and len(result['errors']) > 0:
-                    print(f"    ⚠ {len(result['errors'])} Zugriffsfehler")
+            for i, location in enumerate(self.locations, 1):
+                name = location['name']
+                print(f"[{i}/{len(self.locations)}] Scanne: {name}...", end='', flush=True)
                 
-                self.total_size += result['size']
-                self.total_files += result['files']
-                self.total_scanned += 1
-            else:
-                print(f" ✗ (nicht gefunden)")
-            
-            if result['warning']:
-                print(f"    ℹ {result['warning']}")
+                result = next(results)
+                self.scan_results[name] = result
+                self.report.add(result)
+                
+                if result['exists']:
+                    print(f" ✓")
+                    print(f"    Größe: {format_size(result['size'])}, Dateien: {result['files']}")
+                    if result['filter']:
+                        print(f"    Freigebbar (Filter): {format_size(result['reclaimable_size'])}, "
+                              f"Dateien: {result['reclaimable_files']}")
+                    if result['errors'] and len(result['errors']) > 0:
+                        print(f"    ⚠ {len(result['errors'])} Zugriffsfehler")
+                    
+                    self.total_size += result['size']
+                    self.total_files += result['files']
+                    self.total_scanned += 1
+                else:
+                    print(f" ✗ (nicht gefunden)")
+                
+                if result['warning']:
+                    print(f"    ℹ {result['warning']}")
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+        
+        if self.scan_cache is not None:
+            self.scan_cache.save()
         
         print()
         print("=" * 70)
@@ -171,164 +273,96 @@ class TempFileCleanerExtended:
         print("=" * 70)
         print()
     
-    def create_markdown_report(self) -> str:
-        """Create detailed markdown report"""
-        report_filename = f"temp_scan_report_{self.timestamp}.md"
-        report_path = os.path.join(os.getcwd(), report_filename)
-        
-        with open(report_path, 'w', encoding='utf-8') as f:
-            f.write("# Windows Temporäre Dateien - Extended Scan Report\n\n")
-            f.write(f"**Erstellt am:** {datetime.datetime.now().strftime('%d.%m.%Y um %H:%M:%S')}\n")
-            f.write(f"**Benutzer:** {self.username}\n")
-            f.write(f"**Administrator-Rechte:** {'Ja' if self.is_admin else 'Nein'}\n\n")
-            f.write("---\n\n")
-            
-            # Summary
-            f.write("## Zusammenfassung\n\n")
-            f.write(f"- **Gesamtgröße:** {format_size(self.total_size)}\n")
-            f.write(f"- **Anzahl Dateien:** {self.total_files:,}\n")
-            f.write(f"- **Gefundene Locations:** {self.total_scanned} von {len(self.locations)}\n")
-            f.write(f"- **Löschbare Locations:** {len([r for r in self.scan_results.values() if r['safe_delete'] and r['exists']])}\n\n")
-            f.write("---\n\n")
-            
-            # Priority breakdown
-            f.write("## Nach Priorität\n\n")
-            
-            priority_groups = {
-                Priority.CRITICAL: ("🔴 Kritisch (Hohe Priorität, spezielle Behandlung)", []),
-                Priority.HIGH: ("🟠 Hoch (Große Dateien, sicher löschbar)", []),
-                Priority.MEDIUM: ("🟡 Mittel (Moderate Größe)", []),
-                Priority.LOW: ("🟢 Niedrig (Klein oder bedingt löschbar)", []),
-                Priority.NEVER: ("⚫ Nur Anzeige (NIEMALS löschen)", []),
-            }
-            
-            for result in self.scan_results.values():
-                if result['exists']:
-                    pri = result['priority']
-                    if pri in priority_groups:
-                        priority_groups[pri][1].append(result)
-            
-            for priority, (label, results) in sorted(priority_groups.items()):
-                if not results:
-                    continue
-                    
-                f.write(f"### {label}\n\n")
-                
-                # Sort by size within priority
-                results.sort(key=lambda x: x['size'], reverse=True)
-                
-                for result in results:
-                    f.write(f"#### {result['name']}\n\n")
-                    f.write(f"- **Größe:** {format_size(result['size'])}\n")
-                    f.write(f"- **Dateien:** {result['files']:,}\n")
-                    f.write(f"- **Kategorie:** {result['category']}\n")
-                    f.write(f"- **Sicher löschbar:** {'✅ Ja' if result['safe_delete'] else '❌ Nein'}\n")
-                    
-                    if result['requires_admin']:
-                        f.write(f"- **Benötigt Admin:** Ja\n")
-                    
-                    if result['description']:
-                        f.write(f"- **Beschreibung:** {result['description']}\n")
-                    
-                    if result['warning']:
-                        f.write(f"- **⚠ Warnung:** {result['warning']}\n")
-                    
-                    # Show first path
-                    if result['paths']:
-                        f.write(f"- **Pfad:** `{result['paths'][0]}`\n")
-                    
-                    if len(result['errors']) > 0:
-                        f.write(f"- **Fehler:** {len(result['errors'])} Zugriffsprobleme\n")
-                    
-                    f.write("\n")
-                
-                f.write("---\n\n")
-            
-            # Category breakdown
-            f.write("## Nach Kategorie\n\n")
-            
-            categories = {}
+    def create_markdown_report(self, report_path: Optional[str] = None) -> str:
+        """Create detailed markdown report (default: temp_scan_report_<timestamp>.md in the working directory)"""
+        if report_path is None:
+            report_filename = f"temp_scan_report_{self.timestamp}.md"
+            report_path = os.path.join(os.getcwd(), report_filename)
+        
+        # Results stored without scan_all_locations (e.g. single scans) are aggregated now
+        if self.report.count == 0:
             for result in self.scan_results.values():
-                if not result['exists']:
-                    continue
-                cat = result['category']
-                if cat not in categories:
-                    categories[cat] = {'size': 0, 'files': 0, 'count': 0}
-                categories[cat]['size'] += result['size']
-                categories[cat]['files'] += result['files']
-                categories[cat]['count'] += 1
-            
-            for cat, stats in sorted(categories.items(), key=lambda x: x[1]['size'], reverse=True):
-                f.write(f"- **{cat}:** {format_size(stats['size'])} "
-                       f"({stats['files']:,} Dateien in {stats['count']} Locations)\n")
-            
-            f.write("\n---\n\n")
-            
-            # Recommendations
-            f.write("## Empfehlungen\n\n")
-            
-            # Top 10 largest
-            largest = sorted(
-                [r for r in self.scan_results.values() if r['exists'] and r['safe_delete']],
-                key=lambda x: x['size'],
-                reverse=True
-            )[:10]
-            
-            if largest:
-                f.write("### Top 10 größte löschbare Locations:\n\n")
-                for i, result in enumerate(largest, 1):
-                    f.write(f"{i}. **{result['name']}** - {format_size(result['size'])}\n")
-                f.write("\n")
-            
-            # Critical warnings
-            critical_locs = [r for r in self.scan_results.values() 
-                           if r['exists'] and r['priority'] == Priority.CRITICAL]
-            
-            if critical_locs:
-                f.write("### ⚠ Kritische Locations (Spezielle Behandlung erforderlich):\n\n")
-                for result in critical_locs:
-                    f.write(f"- **{result['name']}:** {format_size(result['size'])}\n")
-                    if result['warning']:
-                        f.write(f"  - *{result['warning']}*\n")
-                f.write("\n")
-            
-            f.write("---\n\n")
-            f.write("*Report generiert durch Windows Temp File Cleaner Extended v2.0*\n")
+                self.report.add(result)
+        
+        header = {
+            'Erstellt am': datetime.datetime.now().strftime('%d.%m.%Y um %H:%M:%S'),
+            'Benutzer': self.username,
+            'Administrator-Rechte': 'Ja' if self.is_admin else 'Nein',
+        }
+        
+        with metrics.phase(GLOBAL_LOCATION, 'report'), \
+                open(report_path, 'w', encoding='utf-8', buffering=REPORT_BUFFER_SIZE) as f:
+            self.report.write_markdown(
+                f, header, self.total_size, self.total_files,
+                self.total_scanned, len(self.locations)
+            )
         
         return report_path
     
-    def delete_location(self, location_name: str) -> Tuple[bool, str, int, int]:
+    def export_jsonl(self, path: str) -> int:
+        """Write one JSON Lines record per scanned location (for fleet aggregation)"""
+        with metrics.phase(GLOBAL_LOCATION, 'report'):
+            return write_jsonl(path, self.scan_results.values(), socket.gethostname(), self.timestamp)
+    
+    def export_inventory(self, path: str) -> int:
+        """Write the per-file inventories of the last scan in the compact binary format"""
+        return write_inventory_binary(path, self.inventories)
+    
+    def check_delete_preconditions(self, location_name: str) -> Optional[str]:
         """
-        Delete files at a specific location
+        Check whether a location may be deleted right now
         
         Returns:
-            Tuple of (success, message, deleted_files, freed_bytes)
+            Error message, or None if deletion may proceed
         """
         if location_name not in self.scan_results:
-            return False, "Unbekannter Ort", 0, 0
+            return "Unbekannter Ort"
         
         result = self.scan_results[location_name]
         
         if not result['exists']:
-            return False, "Location existiert nicht", 0, 0
+            return "Location existiert nicht"
         
         if not result['safe_delete']:
-            return False, "Location ist nicht sicher zu löschen!", 0, 0
+            return "Location ist nicht sicher zu löschen!"
         
         # Check admin requirements
         if result['requires_admin'] and not self.is_admin:
-            return False, "Benötigt Administrator-Rechte", 0, 0
+            return "Benötigt Administrator-Rechte"
         
         # Check for running processes
         if result['process_check']:
-            running = ProcessManager.get_running_processes(result['process_check'])
+            with metrics.phase(location_name, 'process_check'):
+                running = ProcessManager.get_running_processes(result['process_check'])
             if running:
-                return False, f"Prozesse laufen noch: {', '.join(running)}", 0, 0
+                return f"Prozesse laufen noch: {', '.join(running)}"
+        
+        return None
+    
+    def delete_location(self, location_name: str,
+                        manage_service: bool = True) -> Tuple[bool, str, int, int]:
+        """
+        Delete files at a specific location
+        
+        Args:
+            location_name: Name of the scanned location
+            manage_service: Stop/start service_to_stop around the deletion.
+                            False when the caller (delete_locations) already stopped it.
+        
+        Returns:
+            Tuple of (success, message, deleted_files, freed_bytes)
+        """
+        error = self.check_delete_preconditions(location_name)
+        if error:
+            return False, error, 0, 0
+        
+        result = self.scan_results[location_name]
         
         # Stop service if required
         service_stopped = False
-        if result['service_to_stop']:
-            success, msg = ServiceManager.stop_service(result['service_to_stop'])
+        if manage_service and result['service_to_stop']:
+            with metrics.phase(location_name, 'service_stop'):
+                success, msg = ServiceManager.stop_service(result['service_to_stop'])
             if success:
                 service_stopped = True
             else:
@@ -337,18 +371,39 @@ class TempFileCleanerExtended:
         # Delete files
         total_deleted = 0
         total_freed = 0
-        all_errors = []
-        
-        for path in result['paths']:
-            if os.path.exists(path):
-                deleted, freed, errors = FileOperations.delete_directory(path)
-                total_deleted += deleted
-                total_freed += freed
-                all_errors.extend(errors)
+        all_errors = ErrorCollector()
+        counters = [0, 0]  # directories, stat calls
+        
+        with metrics.phase(location_name, 'delete') as phase:
+            inventory = self.inventories.pop(location_name, None)
+            if inventory is not None:
+                # Work from the files recorded during the scan, no second traversal
+                total_deleted, total_freed, all_errors = FileOperations.delete_from_inventory(
+                    inventory, retry_wait=self.retry_wait, counters=counters
+                )
+                inventory.close()
+            else:
+                # retry_wait bounds the whole location, not each of its paths
+                retry_deadline = time.monotonic() + self.retry_wait
+                for path in result['paths']:
+                    if os.path.exists(path):
+                        deleted, freed, errors = FileOperations.delete_directory(
+                            path, workers=self.walk_workers, matcher=self.get_matcher(result),
+                            exclusions=self.overlap_index.exclusions_for(location_name, path),
+                            predicate=self.get_predicate(result),
+                            retry_wait=max(0.0, retry_deadline - time.monotonic()),
+                            counters=counters
+                        )
+                        total_deleted += deleted
+                        total_freed += freed
+                        all_errors.extend(errors)
+            phase.add(dirs=counters[0], files=total_deleted, stat_calls=counters[1],
+                      bytes=total_freed, errors=len(all_errors))
         
         # Restart service if it was stopped
         if service_stopped:
-            ServiceManager.start_service(result['service_to_stop'])
+            with metrics.phase(location_name, 'service_start'):
+                ServiceManager.start_service(result['service_to_stop'])
         
         # Build result message
         msg = f"✓ {total_deleted} Dateien gelöscht ({format_size(total_freed)} freigegeben)"
@@ -357,174 +412,360 @@ class TempFileCleanerExtended:
         
         return True, msg, total_deleted, total_freed
     
-    def interactive_cleanup(self):
-        """Interactive cleanup interface"""
-        print("\n" + "=" * 70)
-        print("INTERAKTIVE BEREINIGUNG")
-        print("=" * 70)
-        print()
-        
-        # Get deletable locations sorted by size
-        deletable = sorted(
-            [(name, r) for name, r in self.scan_results.items() 
-             if r['exists'] and r['safe_delete']],
-            key=lambda x: x[1]['size'],
-            reverse=True
-        )
+    def delete_locations(self, location_names: List[str]) -> Iterator[Tuple[str, Tuple[bool, str, int, int]]]:
+        """
+        Delete several locations concurrently, stopping each required service only once
         
-        if not deletable:
-            print("Keine löschbaren Locations gefunden.")
-            return
+        Locations are grouped by service_to_stop. Each group stops its
+        service once, hands its locations to a shared pool of
+        delete_workers threads and restarts the service once all of them
+        are done; the groups (including the one without a service) run
+        concurrently. At most volume_workers deletions run on the same
+        volume (st_dev) at a time.
         
-        print(f"Gefunden: {len(deletable)} löschbare Locations\n")
+        Args:
+            location_names: Locations to delete
         
-        # Show by priority
-        for priority in [Priority.CRITICAL, Priority.HIGH, Priority.MEDIUM, Priority.LOW]:
-            priority_locs = [(n, r) for n, r in deletable if r['priority'] == priority]
-            
-            if not priority_locs:
-                continue
-            
-            priority_names = {
-                Priority.CRITICAL: "🔴 KRITISCH",
-                Priority.HIGH: "🟠 HOCH",
-                Priority.MEDIUM: "🟡 MITTEL",
-                Priority.LOW: "🟢 NIEDRIG",
-            }
+        Yields:
+            (location_name, delete_location result) in the order given
+        """
+        location_names = list(dict.fromkeys(location_names))  # drop duplicates, keep order
+        groups = {}
+        for name in location_names:
+            service = self.scan_results.get(name, {}).get('service_to_stop')
+            groups.setdefault(service, []).append(name)
+        
+        futures = {name: Future() for name in location_names}
+        futures_lock = threading.Lock()
+        volumes = VolumeLimiter(self.volume_workers)
+        
+        def resolve(name: str, outcome: Tuple[bool, str, int, int]):
+            # First outcome wins; a failed group may race its still running deletions
+            with futures_lock:
+                if not futures[name].done():
+                    futures[name].set_result(outcome)
+        
+        def delete_one(name: str):
+            try:
+                paths = self.scan_results[name]['paths']
+                with volumes.slot(VolumeLimiter.device_of(paths)):
+                    resolve(name, self.delete_location(name, manage_service=False))
+            except Exception as e:
+                resolve(name, (False, f"Exception: {e}", 0, 0))
+        
+        def run_group(service: Optional[str], names: List[str]):
+            # Report precondition failures up front, so a service is only
+            # stopped if at least one of its locations will be deleted
+            ready = []
+            for name in names:
+                error = self.check_delete_preconditions(name)
+                if error:
+                    resolve(name, (False, error, 0, 0))
+                else:
+                    ready.append(name)
             
-            print(f"\n{priority_names.get(priority, 'UNKNOWN')}:")
-            print("-" * 70)
+            if service and ready:
+                # The service is stopped once for the group, so its time goes to the first location
+                with metrics.phase(ready[0], 'service_stop'):
+                    success, msg = ServiceManager.stop_service(service)
+                if not success:
+                    for name in ready:
+                        resolve(name, (False, f"Service konnte nicht gestoppt werden: {msg}", 0, 0))
+                    return
             
-            for name, result in priority_locs:
-                idx = deletable.index((name, result)) + 1
-                print(f"{idx:2d}. {name}")
-                print(f"    Größe: {format_size(result['size'])}, Dateien: {result['files']}")
-                print(f"    Pfad: {result['paths'][0]}")
-                if result['warning']:
-                    print(f"    ⚠ {result['warning']}")
-                if result['process_check']:
-                    print(f"    ⚙ Prüft Prozesse: {', '.join(result['process_check'])}")
-                print()
-        
-        print("\nOptionen:")
-        print("  a           - Alle SICHEREN Locations löschen")
-        print("  h           - Nur HOHE Priorität löschen")
-        print("  1,2,3       - Spezifische Nummern löschen (kommagetrennt)")
-        print("  q           - Abbrechen")
-        print()
-        
-        choice = input("Deine Wahl: ").strip().lower()
-        
-        if choice == 'q':
-            print("Abgebrochen.")
-            return
-        
-        locations_to_delete = []
-        
-        if choice == 'a':
-            # All safe locations
-            locations_to_delete = [name for name, _ in deletable]
-        elif choice == 'h':
-            # Only high priority
-            locations_to_delete = [name for name, r in deletable 
-                                  if r['priority'] in [Priority.HIGH, Priority.CRITICAL]]
-        else:
-            # Specific indices
             try:
-                indices = [int(x.strip()) for x in choice.split(',')]
-                locations_to_delete = [deletable[i-1][0] for i in indices 
-                                      if 1 <= i <= len(deletable)]
-            except (ValueError, IndexError):
-                print("❌ Ungültige Eingabe!")
-                return
-        
-        if not locations_to_delete:
-            print("Keine Locations ausgewählt.")
-            return
-        
-        # Calculate total size
-        total_size_to_delete = sum(
-            self.scan_results[loc]['size'] for loc in locations_to_delete
-        )
-        
-        # Show summary and confirm
-        print(f"\n{'='*70}")
-        print(f"WARNUNG: Du bist dabei {format_size(total_size_to_delete)} zu löschen!")
-        print(f"{'='*70}")
-        print(f"\nAusgewählte Locations ({len(locations_to_delete)}):")
-        for loc in locations_to_delete:
-            result = self.scan_results[loc]
-            print(f"  • {loc} - {format_size(result['size'])}")
-        print()
-        
-        if not confirm_action("Wirklich löschen?", default=False):
-            print("❌ Abgebrochen.")
-            return
-        
-        # Perform deletion
-        print(f"\n{'='*70}")
-        print("LÖSCHE DATEIEN...")
-        print(f"{'='*70}\n")
-        
-        total_deleted_files = 0
-        total_freed_bytes = 0
-        
-        for loc in locations_to_delete:
-            print(f"Bearbeite: {loc}...")
-            success, message, deleted, freed = self.delete_location(loc)
+                # The service stays stopped until every location of the group is done
+                for task in [deleters.submit(delete_one, name) for name in ready]:
+                    task.result()
+            finally:
+                if service and ready:
+                    with metrics.phase(ready[0], 'service_start'):
+                        ServiceManager.start_service(service)
+        
+        def run_group_safe(service: Optional[str], names: List[str]):
+            # A raising check or service backend must not leave callers waiting forever
+            try:
+                run_group(service, names)
+            except Exception as e:
+                for name in names:
+                    resolve(name, (False, f"Exception: {e}", 0, 0))
+        
+        with ThreadPoolExecutor(max_workers=self.delete_workers) as deleters, \
+                ThreadPoolExecutor(max_workers=len(groups) or 1) as executor:
+            for service, names in groups.items():
+                executor.submit(run_group_safe, service, names)
             
-            if success:
-                print(f"  {message}")
-                total_deleted_files += deleted
-                total_freed_bytes += freed
-            else:
-                print(f"  ❌ Fehler: {message}")
-            print()
-        
-        print("=" * 70)
-        print("BEREINIGUNG ABGESCHLOSSEN")
-        print("=" * 70)
-        print(f"\nGesamt gelöscht: {total_deleted_files:,} Dateien")
-        print(f"Gesamt freigegeben: {format_size(total_freed_bytes)}")
-        print()
+            for name in location_names:
+                yield name, futures[name].result()
+    
+    def interactive_cleanup(self):
+        """Interactive cleanup interface (see interactive.py)"""
+        from interactive import interactive_cleanup
+        interactive_cleanup(self)
+
+
+# Exit codes of batch runs
+EXIT_OK = 0
+EXIT_ERROR = 1        # Unexpected error or abort
+EXIT_USAGE = 2        # Invalid arguments or empty selection (also argparse errors)
+EXIT_INCOMPLETE = 3   # At least one location could not be deleted
+
+PRIORITY_NAMES = {
+    'critical': Priority.CRITICAL,
+    'high': Priority.HIGH,
+    'medium': Priority.MEDIUM,
+    'low': Priority.LOW,
+    'never': Priority.NEVER,
+}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Windows Temporäre Dateien Scanner & Cleaner")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Scan-Cache ignorieren und alle Verzeichnisse neu einlesen")
+    parser.add_argument('--export-jsonl', metavar='DATEI',
+                        help="Scan-Ergebnisse zusätzlich als JSON Lines speichern")
+    parser.add_argument('--export-inventory', metavar='DATEI',
+                        help="Datei-Inventar im kompakten Binärformat speichern")
+    parser.add_argument('--scan-workers', type=int, default=DEFAULT_SCAN_WORKERS, metavar='N',
+                        help=f"Gleichzeitig gescannte Locations (Standard: {DEFAULT_SCAN_WORKERS})")
+    parser.add_argument('--walk-workers', type=int, default=DEFAULT_WALK_WORKERS, metavar='N',
+                        help=f"Threads pro Verzeichnisbaum (Standard: {DEFAULT_WALK_WORKERS})")
+    parser.add_argument('--retry-wait', type=float, default=DEFAULT_RETRY_WAIT, metavar='SEKUNDEN',
+                        help="Höchstens so lange auf gesperrte Dateien warten "
+                             f"(Standard: {DEFAULT_RETRY_WAIT:g})")
+    parser.add_argument('--delete-workers', type=int, default=DEFAULT_DELETE_WORKERS, metavar='N',
+                        help=f"Gleichzeitig gelöschte Locations (Standard: {DEFAULT_DELETE_WORKERS})")
+    parser.add_argument('--volume-workers', type=int, default=DEFAULT_VOLUME_WORKERS, metavar='N',
+                        help="Davon höchstens N auf demselben Laufwerk "
+                             f"(Standard: {DEFAULT_VOLUME_WORKERS})")
+    
+    batch = parser.add_argument_group("Batch-Modus (ohne Rückfragen, z.B. als geplante Aufgabe)")
+    batch.add_argument('--batch', action='store_true',
+                       help="Nicht-interaktiv: ausgewählte sichere Locations scannen und löschen")
+    batch.add_argument('--location', action='append', default=[], metavar='NAME',
+                       help="Nur diese Location (mehrfach angebbar)")
+    batch.add_argument('--category', action='append', default=[], metavar='KATEGORIE',
+                       help="Nur Locations dieser Kategorie (mehrfach angebbar)")
+    batch.add_argument('--priority', action='append', default=[], choices=sorted(PRIORITY_NAMES),
+                       help="Nur Locations dieser Priorität (mehrfach angebbar)")
+    batch.add_argument('--scan-only', action='store_true', help="Nur scannen, nichts löschen")
+    batch.add_argument('--dry-run', action='store_true',
+                       help="Anzeigen, was gelöscht würde, ohne zu löschen")
+    batch.add_argument('--format', choices=['text', 'json', 'markdown'], default='text',
+                       help="Ausgabeformat der Zusammenfassung (Standard: text)")
+    batch.add_argument('--output', metavar='DATEI',
+                       help="Zusammenfassung in Datei statt auf stdout (Markdown: Report-Pfad)")
+    
+    measure = parser.add_argument_group("Messung")
+    measure.add_argument('--metrics', action='store_true',
+                         help="Zeiten und Zähler pro Location und Phase als Tabelle ausgeben (stderr)")
+    measure.add_argument('--metrics-json', metavar='DATEI',
+                         help="Zeiten und Zähler pro Location und Phase als JSON speichern")
+    measure.add_argument('--profile', choices=['cprofile', 'tracemalloc'],
+                         help="Gesamten Lauf mit cProfile oder tracemalloc messen")
+    measure.add_argument('--profile-output', metavar='DATEI',
+                         help="Ausgabedatei für --profile (Standard: cleaner_<Zeitstempel>.prof/.txt)")
+    
+    sandbox = parser.add_argument_group("Pfade (z.B. Lasttests auf Linux)")
+    sandbox.add_argument('--root', metavar='VERZEICHNIS',
+                         help=r"Alle Location-Pfade unter dieses Verzeichnis abbilden (C:\X -> VERZEICHNIS/C/X)")
+    sandbox.add_argument('--env', action='append', default=[], metavar='NAME=WERT',
+                         help=r"Umgebungsvariable für die Pfade setzen, z.B. LOCALAPPDATA=D:\Local "
+                              "(mehrfach angebbar)")
+    
+    args = parser.parse_args(argv)
+    args.environment = {}
+    for pair in args.env:
+        name, sep, value = pair.partition('=')
+        if not sep or not name:
+            parser.error(f"--env erwartet NAME=WERT: {pair}")
+        args.environment[name] = value
+    return args
 
 
-def main():
-    """Main application entry point"""
-    cleaner = TempFileCleanerExtended()
+def make_path_mapper(args: argparse.Namespace) -> Optional[PathMapper]:
+    """PathMapper for --root/--env, or None for the real paths of this machine"""
+    if not args.root and not args.environment:
+        return None
+    return PathMapper(args.root, args.environment)
+
+
+def select_locations(registry: LocationRegistry, names: List[str], categories: List[str],
+                     priorities: List[str]) -> Tuple[List[dict], List[str]]:
+    """
+    Select locations by name, category and priority
+    
+    Values of one option are alternatives, different options must all
+    match. Without any option every location is selected.
+    
+    Returns:
+        Tuple of (selected locations in configuration order, unknown names)
+    """
+    unknown = [name for name in names if registry.get(name) is None]
+    
+    # One set of matching locations per given option, a location must be in all of them
+    required = []
+    if names:
+        required.append({id(registry.get(name)) for name in names if registry.get(name) is not None})
+    if categories:
+        required.append({id(loc) for category in categories
+                         for loc in registry.by_category(category.lower())})
+    if priorities:
+        required.append({id(loc) for priority in priorities
+                         for loc in registry.by_priority(PRIORITY_NAMES[priority])})
+    
+    selected = [loc for loc in registry.all() if all(id(loc) in ids for ids in required)]
+    return selected, unknown
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """
+    Headless run: scan the selection, delete its safe locations unless
+    --scan-only/--dry-run, and write a summary in the chosen format
+    
+    Returns:
+        Process exit code (EXIT_*)
+    """
+    selected, unknown = select_locations(location_registry, args.location,
+                                         args.category, args.priority)
+    if unknown:
+        print(f"Unbekannte Location: {', '.join(unknown)}", file=sys.stderr)
+        return EXIT_USAGE
+    if not selected:
+        print("Keine Location entspricht der Auswahl", file=sys.stderr)
+        return EXIT_USAGE
     
-    # Print header
-    cleaner.print_header()
+    delete = not (args.scan_only or args.dry_run)
+    cleaner = TempFileCleanerExtended(
+        scan_workers=args.scan_workers, walk_workers=args.walk_workers,
+        # The inventory serves the delete phase and --export-inventory
+        keep_inventory=(delete and DEFAULT_KEEP_INVENTORY) or bool(args.export_inventory),
+        use_cache=not args.no_cache, locations=selected, retry_wait=args.retry_wait,
+        delete_workers=args.delete_workers, volume_workers=args.volume_workers,
+        path_mapper=make_path_mapper(args)
+    )
     
-    # Scan all locations
-    cleaner.scan_all_locations()
+    # Progress goes to stderr when stdout carries the JSON summary
+    json_to_stdout = args.format == 'json' and not args.output
+    deletions = {}
+    with contextlib.redirect_stdout(sys.stderr) if json_to_stdout else contextlib.nullcontext():
+        cleaner.scan_all_locations()
+        
+        if args.export_jsonl:
+            cleaner.export_jsonl(args.export_jsonl)
+        if args.export_inventory:
+            cleaner.export_inventory(args.export_inventory)
+        
+        targets = [name for name, result in cleaner.scan_results.items()
+                   if result['exists'] and result['safe_delete'] and result['reclaimable_files']]
+        if args.dry_run:
+            for name in targets:
+                result = cleaner.scan_results[name]
+                print(f"[Dry Run] {name}: {format_size(result['reclaimable_size'])} "
+                      f"in {result['reclaimable_files']:,} Dateien")
+        elif delete:
+            for name, outcome in cleaner.delete_locations(targets):
+                deletions[name] = outcome
+                print(f"{name}: {outcome[1]}" if outcome[0] else f"{name}: ❌ {outcome[1]}")
     
-    # Create report
-    print("Erstelle erweiterten Markdown-Report...")
-    report_path = cleaner.create_markdown_report()
-    print(f"✓ Report erstellt: {report_path}\n")
+    exit_code = EXIT_OK if all(outcome[0] for outcome in deletions.values()) else EXIT_INCOMPLETE
     
-    # Offer cleanup
-    if cleaner.total_size > 0:
-        if confirm_action("Möchtest du jetzt Dateien löschen?", default=False):
-            cleaner.interactive_cleanup()
+    if args.format == 'markdown':
+        report_path = cleaner.create_markdown_report(args.output)
+        print(f"✓ Report erstellt: {report_path}")
+    elif args.format == 'json':
+        summary = {
+            'host': socket.gethostname(),
+            'timestamp': cleaner.timestamp,
+            'mode': 'scan' if args.scan_only else 'dry_run' if args.dry_run else 'delete',
+            'exit_code': exit_code,
+            'total_size': cleaner.total_size,
+            'total_files': cleaner.total_files,
+            'locations': [
+                {
+                    'name': name,
+                    'exists': result['exists'],
+                    'size': result['size'],
+                    'files': result['files'],
+                    'reclaimable_size': result['reclaimable_size'],
+                    'reclaimable_files': result['reclaimable_files'],
+                    'errors': len(result['errors']),
+                    'deleted': name in deletions and deletions[name][0],
+                    'deleted_files': deletions[name][2] if name in deletions else 0,
+                    'freed_bytes': deletions[name][3] if name in deletions else 0,
+                    'message': deletions[name][1] if name in deletions else None,
+                }
+                for name, result in cleaner.scan_results.items()
+            ],
+        }
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
         else:
-            print("\n✓ Keine Bereinigung durchgeführt.")
-            print("  Du kannst den Report jederzeit einsehen für Details.")
+            json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+            print()
     else:
-        print("ℹ Keine temporären Dateien zum Löschen gefunden.")
+        freed = sum(outcome[3] for outcome in deletions.values())
+        lines = [f"Gescannt: {format_size(cleaner.total_size)} in {cleaner.total_files:,} Dateien"]
+        if deletions:
+            lines.append(f"Freigegeben: {format_size(freed)}")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+        else:
+            print('\n'.join(lines))
     
-    print(f"\n✓ Fertig! Report: {report_path}")
+    return exit_code
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Main application entry point
+    
+    Returns:
+        Process exit code
+    """
+    args = parse_args(argv)
+    metrics.enable(args.metrics or bool(args.metrics_json))
+    profile_output = args.profile_output
+    if args.profile and not profile_output:
+        extension = '.prof' if args.profile == 'cprofile' else '.txt'
+        profile_output = f"cleaner_{datetime.datetime.now():%Y%m%d_%H%M%S}{extension}"
+    
+    try:
+        with metrics.profile(args.profile, profile_output):
+            if args.batch:
+                return run_batch(args)
+            
+            # The interactive front end (prompts, menus) is only loaded when needed
+            from interactive import run_interactive
+            cleaner = TempFileCleanerExtended(
+                scan_workers=args.scan_workers, walk_workers=args.walk_workers,
+                keep_inventory=DEFAULT_KEEP_INVENTORY or bool(args.export_inventory),
+                use_cache=not args.no_cache, retry_wait=args.retry_wait,
+                delete_workers=args.delete_workers, volume_workers=args.volume_workers,
+                path_mapper=make_path_mapper(args)
+            )
+            return run_interactive(cleaner, args)
+    finally:
+        if args.metrics:
+            print(metrics.summary_table(), file=sys.stderr)
+        if args.metrics_json:
+            metrics.dump_json(args.metrics_json)
+        if args.profile:
+            print(f"Profil gespeichert: {profile_output}", file=sys.stderr)
 
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except KeyboardInterrupt:
         print("\n\n❌ Programm durch Benutzer abgebrochen.")
-        sys.exit(1)
+        sys.exit(EXIT_ERROR)
     except Exception as e:
         print(f"\n\n❌ Unerwarteter Fehler: {e}")
         import traceback
         traceback.print_exc()
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(EXIT_ERROR)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrumentation for Windows Temp File Cleaner
+Wall time and counters per location and phase, optional profiler hooks
+"""
+
+import json
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+
+# Phases in the order they are shown
+PHASES = ('expand', 'traverse', 'process_check', 'service_stop', 'delete', 'service_start', 'report')
+
+PHASE_LABELS = {
+    'expand': "Pfade",
+    'traverse': "Scan",
+    'process_check': "Prozesse",
+    'service_stop': "Dienst-Stopp",
+    'delete': "Löschen",
+    'service_start': "Dienst-Start",
+    'report': "Bericht",
+}
+
+# Location key for work that belongs to no single location (e.g. the report)
+GLOBAL_LOCATION = '(gesamt)'
+
+# Lines of the tracemalloc summary written by Metrics.profile
+TRACEMALLOC_TOP = 25
+
+
+class PhaseStats:
+    """Accumulated numbers of one phase of one location"""
+    
+    __slots__ = ('wall', 'calls', 'dirs', 'files', 'stat_calls', 'bytes', 'errors', 'subprocess')
+    
+    def __init__(self):
+        self.wall = 0.0
+        self.calls = 0
+        self.dirs = 0
+        self.files = 0
+        self.stat_calls = 0
+        self.bytes = 0
+        self.errors = 0
+        self.subprocess = 0.0
+    
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.wall if self.wall > 0 else 0.0
+    
+    def merge(self, other: 'PhaseStats'):
+        """Add another PhaseStats"""
+        for field in self.__slots__:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+    
+    def to_dict(self) -> dict:
+        data = {field: getattr(self, field) for field in self.__slots__}
+        data['bytes_per_second'] = self.bytes_per_second
+        return data
+
+
+class _Phase:
+    """Running measurement, returned by Metrics.phase"""
+    
+    __slots__ = ('_metrics', '_stats', '_start', '_previous')
+    
+    def __init__(self, metrics: 'Metrics', stats: PhaseStats):
+        self._metrics = metrics
+        self._stats = stats
+        self._start = 0.0
+        self._previous = None
+    
+    def __enter__(self) -> '_Phase':
+        local = self._metrics._local
+        self._previous = getattr(local, 'phase', None)
+        local.phase = self
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self._start
+        with self._metrics._lock:
+            self._stats.wall += elapsed
+            self._stats.calls += 1
+        self._metrics._local.phase = self._previous
+        return False
+    
+    def add(self, dirs: int = 0, files: int = 0, stat_calls: int = 0, bytes: int = 0, errors: int = 0):
+        """Add counters of the work done in this phase"""
+        stats = self._stats
+        with self._metrics._lock:
+            stats.dirs += dirs
+            stats.files += files
+            stats.stat_calls += stat_calls
+            stats.bytes += bytes
+            stats.errors += errors
+    
+    def add_subprocess(self, seconds: float):
+        with self._metrics._lock:
+            self._stats.subprocess += seconds
+
+
+class _NullPhase:
+    """Shared stand-in while instrumentation is disabled (does nothing)"""
+    
+    __slots__ = ()
+    
+    def __enter__(self) -> '_NullPhase':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+    
+    def add(self, dirs: int = 0, files: int = 0, stat_calls: int = 0, bytes: int = 0, errors: int = 0):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class Metrics:
+    """
+    Per-location, per-phase timings and counters
+    
+    Disabled by default: phase() then returns one shared no-op context
+    manager and subprocess timing is skipped, so the instrumented code
+    pays an attribute check per location and phase, never per file.
+    The walks count directories and stat calls in their per-worker
+    accumulators anyway; phases only receive the merged totals.
+    
+    Subprocess time (net, sc, tasklist, takeown, ...) is attributed to
+    the phase running in the calling thread.
+    """
+    
+    def __init__(self):
+        self.enabled = False
+        self._stats = {}  # location -> {phase -> PhaseStats}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+    
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+    
+    def phase(self, location: str, phase: str):
+        """
+        Measure one phase of a location
+        
+        Use as 'with metrics.phase(name, "traverse") as p: ... p.add(files=...)'
+        """
+        if not self.enabled:
+            return _NULL_PHASE
+        with self._lock:
+            phases = self._stats.setdefault(location, {})
+            stats = phases.get(phase)
+            if stats is None:
+                stats = phases[phase] = PhaseStats()
+        return _Phase(self, stats)
+    
+    def record_subprocess(self, seconds: float):
+        """Attribute the runtime of an external command to the current phase"""
+        current = getattr(self._local, 'phase', None)
+        if current is not None:
+            current.add_subprocess(seconds)
+    
+    def items(self) -> Iterator[Tuple[str, str, PhaseStats]]:
+        """(location, phase, stats) in recording order of locations and PHASES order"""
+        with self._lock:
+            snapshot = [(location, dict(phases)) for location, phases in self._stats.items()]
+        for location, phases in snapshot:
+            for phase in PHASES:
+                if phase in phases:
+                    yield location, phase, phases[phase]
+    
+    def phase_totals(self) -> Dict[str, PhaseStats]:
+        """Stats summed over all locations, per phase"""
+        totals = {}
+        for _, phase, stats in self.items():
+            totals.setdefault(phase, PhaseStats()).merge(stats)
+        return {phase: totals[phase] for phase in PHASES if phase in totals}
+    
+    def to_dict(self) -> dict:
+        """JSON-ready dump: {'locations': {name: {phase: {...}}}, 'totals': {phase: {...}}}"""
+        locations = {}
+        for location, phase, stats in self.items():
+            locations.setdefault(location, {})[phase] = stats.to_dict()
+        return {
+            'locations': locations,
+            'totals': {phase: stats.to_dict() for phase, stats in self.phase_totals().items()},
+        }
+    
+    def dump_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+    
+    def summary_table(self) -> str:
+        """Plain text table, one line per location and phase plus the phase totals"""
+        header = (f"{'Location':<32} {'Phase':<13} {'Zeit':>8} {'Verz.':>8} {'Dateien':>10} "
+                  f"{'stat':>10} {'MB/s':>8} {'Fehler':>7} {'Extern':>8}")
+        lines = [header, "-" * len(header)]
+        
+        def line(location: str, phase: str, stats: PhaseStats) -> str:
+            return (f"{location[:32]:<32} {PHASE_LABELS[phase]:<13} {stats.wall:>7.2f}s "
+                    f"{stats.dirs:>8,} {stats.files:>10,} {stats.stat_calls:>10,} "
+                    f"{stats.bytes_per_second / (1024 * 1024):>8.1f} {stats.errors:>7,} "
+                    f"{stats.subprocess:>7.2f}s")
+        
+        for location, phase, stats in self.items():
+            lines.append(line(location, phase, stats))
+        totals = self.phase_totals()
+        if totals:
+            lines.append("-" * len(header))
+            for phase, stats in totals.items():
+                lines.append(line("Summe", phase, stats))
+        return '\n'.join(lines)
+    
+    def profile(self, kind: Optional[str], path: str):
+        """
+        Context manager running a profiler around a block
+        
+        Args:
+            kind: 'cprofile' (pstats file), 'tracemalloc' (text summary of the
+                  largest allocation sites) or None (no profiling)
+            path: Output file
+        """
+        if kind == 'cprofile':
+            return _CProfileHook(path)
+        if kind == 'tracemalloc':
+            return _TracemallocHook(path)
+        return _NULL_PHASE
+
+
+class _CProfileHook:
+    """Run cProfile around a block and write the stats for pstats/snakeviz"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._profiler = None
+    
+    def __enter__(self):
+        import cProfile
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._profiler.disable()
+        self._profiler.dump_stats(self.path)
+        return False
+
+
+class _TracemallocHook:
+    """Trace allocations around a block and write the peak and top allocation sites"""
+    
+    def __init__(self, path: str):
+        self.path = path
+    
+    def __enter__(self):
+        import tracemalloc
+        tracemalloc.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(f"Aktuell: {current:,} Bytes, Spitze: {peak:,} Bytes\n\n")
+            for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]:
+                f.write(f"{stat}\n")
+        return False
+
+
+# Shared by main.py (phases) and utils.CommandRunner (subprocess time)
+metrics = Metrics()
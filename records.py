@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact result records for Windows Temp File Cleaner
+Slotted location results, directory aggregates, file entries and error counts
+"""
+
+import errno
+import sys
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from config import Priority
+
+
+# Error messages kept verbatim per ErrorCollector, the rest is only counted
+ERROR_SAMPLE_LIMIT = 20
+
+
+class FileEntry(NamedTuple):
+    """One scanned file (tuple-sized, unpacks like (path, size, mtime_ns))"""
+    path: str
+    size: int
+    mtime_ns: int
+
+
+class DirAggregate(NamedTuple):
+    """Direct file totals of one directory (unpacks like (path, size, files))"""
+    path: str
+    size: int
+    files: int
+
+
+class ErrorCollector:
+    """
+    Bounded collection of file errors
+    
+    Every error is counted by category and errno, but only the first
+    max_samples keep their path and exception, and messages are only
+    formatted when iterated. A tree with 500k denied files costs a few
+    counters instead of 500k strings, and the walk loops do no string
+    formatting.
+    
+    Behaves like the former list of messages where callers need it:
+    len() is the total number of errors, iteration yields the sample
+    messages, append() adds a ready-made message and extend() merges
+    another collector (or strings).
+    """
+    
+    # Message templates per category
+    MESSAGES = {
+        'file': "Fehler bei {path}: {error}",
+        'dir': "Fehler beim Zugriff auf {path}: {error}",
+        'walk': "Fehler beim Durchlaufen von {path}: {error}",
+        'denied': "Zugriff verweigert: {path}",
+        'missing': "Pfad existiert nicht: {path}",
+        'changed': "Seit dem Scan verändert, nicht gelöscht: {path}",
+        'message': "{path}",
+    }
+    
+    def __init__(self, max_samples: int = ERROR_SAMPLE_LIMIT):
+        self.max_samples = max_samples
+        self.total = 0
+        self._counts = {}  # (category, errno or None) -> count
+        self._samples = []  # (category, path or message, exception or None)
+    
+    def add(self, category: str, path: str, error: Optional[BaseException] = None, count: int = 1):
+        """Record count errors of a category (one sample with path and error)"""
+        key = (category, getattr(error, 'errno', None))
+        self._counts[key] = self._counts.get(key, 0) + count
+        self.total += count
+        if len(self._samples) < self.max_samples:
+            self._samples.append((category, path, error))
+    
+    def append(self, message: str):
+        """Record an already formatted message"""
+        self.add('message', message)
+    
+    def extend(self, other: Iterable):
+        """Merge another collector, or append an iterable of messages"""
+        if not isinstance(other, ErrorCollector):
+            for message in other:
+                self.append(message)
+            return
+        for key, count in other._counts.items():
+            self._counts[key] = self._counts.get(key, 0) + count
+        self.total += other.total
+        free = self.max_samples - len(self._samples)
+        if free > 0:
+            self._samples.extend(other._samples[:free])
+    
+    def __len__(self) -> int:
+        return self.total
+    
+    def __iter__(self) -> Iterator[str]:
+        """Yield the formatted sample messages"""
+        for category, path, error in self._samples:
+            yield self.MESSAGES[category].format(path=path, error=error)
+    
+    def counts(self) -> dict:
+        """Return {(category, errno or None): count}"""
+        return dict(self._counts)
+    
+    def by_errno(self) -> dict:
+        """Return {errno name (e.g. 'EACCES') or 'andere': count}, most frequent first"""
+        totals = {}
+        for (_, code), count in self._counts.items():
+            name = errno.errorcode.get(code, 'andere') if code is not None else 'andere'
+            totals[name] = totals.get(name, 0) + count
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+class ScanResult:
+    """
+    Result of scanning one location
+    
+    Uses __slots__ instead of a per-instance dict, and interns the
+    repeated category, method and service strings so thousands of
+    results (e.g. merged fleet exports) share one copy of each.
+    
+    Still supports the mapping access of the former result dicts
+    (result['size'], result.get(...), 'size' in result, dict(result)),
+    so reports, exports and the interactive front end read it unchanged.
+    """
+    
+    __slots__ = (
+        'name', 'category', 'priority', 'paths', 'exists', 'size', 'files',
+        'reclaimable_size', 'reclaimable_files', 'errors', 'safe_delete',
+        'requires_admin', 'description', 'warning', 'method', 'service_to_stop',
+        'process_check', 'patterns', 'filter', 'shared_with', 'largest_files',
+        'largest_dirs', 'size_histogram', 'age_histogram',
+    )
+    
+    def __init__(self, name: str, category: str, priority: int, paths: List[str],
+                 safe_delete: bool = False, requires_admin: bool = False,
+                 description: str = '', warning: str = '', method: str = 'simple_delete',
+                 service_to_stop: Optional[str] = None, process_check: Optional[List[str]] = None,
+                 patterns: Optional[List[str]] = None, filter: Optional[dict] = None,
+                 shared_with: Optional[List[str]] = None):
+        self.name = name
+        self.category = sys.intern(category)
+        self.priority = priority
+        self.paths = paths
+        self.exists = False
+        self.size = 0
+        self.files = 0
+        self.reclaimable_size = 0
+        self.reclaimable_files = 0
+        self.errors = ErrorCollector()
+        self.safe_delete = safe_delete
+        self.requires_admin = requires_admin
+        self.description = description
+        self.warning = warning
+        self.method = sys.intern(method)
+        self.service_to_stop = sys.intern(service_to_stop) if service_to_stop else service_to_stop
+        self.process_check = process_check or []
+        self.patterns = patterns or []
+        self.filter = filter
+        self.shared_with = shared_with or []
+        self.largest_files = []
+        self.largest_dirs = []
+        self.size_histogram = []
+        self.age_histogram = []
+    
+    @classmethod
+    def from_location(cls, location: dict, paths: List[str],
+                      shared_with: Optional[List[str]] = None) -> 'ScanResult':
+        """Create an empty result for a location configuration"""
+        return cls(
+            name=location['name'],
+            category=location.get('category', 'unknown'),
+            priority=location.get('priority', Priority.LOW),
+            paths=paths,
+            safe_delete=location.get('safe_delete', False),
+            requires_admin=location.get('requires_admin', False),
+            description=location.get('description', ''),
+            warning=location.get('warning', ''),
+            method=location.get('method', 'simple_delete'),
+            service_to_stop=location.get('service_to_stop'),
+            process_check=location.get('process_check', []),
+            patterns=location.get('patterns', []),
+            filter=location.get('filter'),
+            shared_with=shared_with,
+        )
+    
+    # Mapping access, compatible with the former result dictionaries
+    
+    def __getitem__(self, key: str):
+        # Only fields are keys, never methods or internals like 'get' or '__slots__'
+        if key not in self.__slots__:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __setitem__(self, key: str, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+    
+    def get(self, key: str, default=None):
+        """Like dict.get"""
+        return getattr(self, key, default) if key in self.__slots__ else default
+    
+    def keys(self) -> Tuple[str, ...]:
+        """Field names in a fixed order (lets dict(result) and dict.update(result) work)"""
+        return self.__slots__
+    
+    def items(self) -> Iterator[Tuple[str, object]]:
+        """(field, value) pairs like dict.items"""
+        return ((key, getattr(self, key)) for key in self.__slots__)
+    
+    def to_dict(self) -> dict:
+        """Plain dictionary copy (e.g. for JSON)"""
+        return dict(self.items())
+    
+    def __repr__(self) -> str:
+        return f"ScanResult(name={self.name!r}, size={self.size}, files={self.files})"
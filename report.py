@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Report generation for Windows Temp File Cleaner
+Collects report aggregates incrementally while the scan runs and exports
+machine-readable results (JSON Lines, compact binary inventories)
+"""
+
+import bisect
+import heapq
+import json
+import sys
+from typing import Dict, Iterable, Iterator, TextIO, Tuple
+
+from config import Priority
+from records import ErrorCollector
+from utils import format_size
+
+
+# Buffer size of the report file writer
+REPORT_BUFFER_SIZE = 256 * 1024
+
+PRIORITY_LABELS = {
+    Priority.CRITICAL: "🔴 Kritisch (Hohe Priorität, spezielle Behandlung)",
+    Priority.HIGH: "🟠 Hoch (Große Dateien, sicher löschbar)",
+    Priority.MEDIUM: "🟡 Mittel (Moderate Größe)",
+    Priority.LOW: "🟢 Niedrig (Klein oder bedingt löschbar)",
+    Priority.NEVER: "⚫ Nur Anzeige (NIEMALS löschen)",
+}
+
+
+class ReportAggregator:
+    """
+    Running report aggregates, updated once per scanned location
+    
+    Keeps per-priority groups ordered by size (binary insertion), running
+    category totals and a bounded min-heap of the largest deletable
+    locations, so rendering the report is a single pass without filtering
+    or sorting all scan results again.
+    """
+    
+    def __init__(self, top_n: int = 10):
+        self.top_n = top_n
+        self.count = 0
+        self.deletable = 0
+        self._seq = 0
+        self._priority_groups = {priority: [] for priority in PRIORITY_LABELS}  # [(-size, seq, result)]
+        self._categories = {}  # category -> [size, files, count]
+        self._largest = []     # min-heap of (size, -seq, result)
+        self._critical = []
+    
+    def add(self, result: dict):
+        """Add one scan result (in scan order)"""
+        self.count += 1
+        if not result['exists']:
+            return
+        
+        self._seq += 1
+        size = result['size']
+        
+        group = self._priority_groups.get(result['priority'])
+        if group is not None:
+            # (-size, seq) keeps equal sizes in scan order, like a stable sort
+            bisect.insort(group, (-size, self._seq, result))
+        
+        stats = self._categories.get(result['category'])
+        if stats is None:
+            stats = self._categories[result['category']] = [0, 0, 0]
+        stats[0] += size
+        stats[1] += result['files']
+        stats[2] += 1
+        
+        if result['safe_delete']:
+            self.deletable += 1
+            # On equal sizes the later location is evicted first
+            entry = (size, -self._seq, result)
+            if len(self._largest) < self.top_n:
+                heapq.heappush(self._largest, entry)
+            elif entry > self._largest[0]:
+                heapq.heapreplace(self._largest, entry)
+        
+        if result['priority'] == Priority.CRITICAL:
+            self._critical.append(result)
+    
+    def write_markdown(self, f: TextIO, header: Dict[str, str], total_size: int,
+                       total_files: int, total_scanned: int, location_count: int):
+        """
+        Render the Markdown report in one pass
+        
+        Args:
+            f: Text stream to write to (ideally buffered)
+            header: Ordered metadata lines shown below the title (label -> value)
+            total_size: Total bytes found
+            total_files: Total files found
+            total_scanned: Number of locations found
+            location_count: Number of configured locations
+        """
+        write = f.write
+        write("# Windows Temporäre Dateien - Extended Scan Report\n\n")
+        for label, value in header.items():
+            write(f"**{label}:** {value}\n")
+        write("\n---\n\n")
+        
+        # Summary
+        write("## Zusammenfassung\n\n")
+        write(f"- **Gesamtgröße:** {format_size(total_size)}\n")
+        write(f"- **Anzahl Dateien:** {total_files:,}\n")
+        write(f"- **Gefundene Locations:** {total_scanned} von {location_count}\n")
+        write(f"- **Löschbare Locations:** {self.deletable}\n\n")
+        write("---\n\n")
+        
+        # Priority breakdown
+        write("## Nach Priorität\n\n")
+        
+        for priority in sorted(self._priority_groups):
+            group = self._priority_groups[priority]
+            if not group:
+                continue
+            
+            write(f"### {PRIORITY_LABELS[priority]}\n\n")
+            for _, _, result in group:
+                self._write_location(write, result)
+            write("---\n\n")
+        
+        # Category breakdown
+        write("## Nach Kategorie\n\n")
+        
+        for cat, (size, files, count) in sorted(self._categories.items(),
+                                                key=lambda x: x[1][0], reverse=True):
+            write(f"- **{cat}:** {format_size(size)} "
+                  f"({files:,} Dateien in {count} Locations)\n")
+        
+        write("\n---\n\n")
+        
+        # Recommendations
+        write("## Empfehlungen\n\n")
+        
+        if self._largest:
+            write(f"### Top {self.top_n} größte löschbare Locations:\n\n")
+            for i, (_, _, result) in enumerate(sorted(self._largest, reverse=True), 1):
+                write(f"{i}. **{result['name']}** - {format_size(result['size'])}\n")
+            write("\n")
+        
+        if self._critical:
+            write("### ⚠ Kritische Locations (Spezielle Behandlung erforderlich):\n\n")
+            for result in self._critical:
+                write(f"- **{result['name']}:** {format_size(result['size'])}\n")
+                if result['warning']:
+                    write(f"  - *{result['warning']}*\n")
+            write("\n")
+        
+        write("---\n\n")
+        write("*Report generiert durch Windows Temp File Cleaner Extended v2.0*\n")
+    
+    @staticmethod
+    def _write_location(write, result: dict):
+        """Write the detail block of one location"""
+        write(f"#### {result['name']}\n\n")
+        write(f"- **Größe:** {format_size(result['size'])}\n")
+        write(f"- **Dateien:** {result['files']:,}\n")
+        if result.get('filter'):
+            write(f"- **Freigebbar (Filter):** {format_size(result['reclaimable_size'])} "
+                  f"in {result['reclaimable_files']:,} Dateien\n")
+        write(f"- **Kategorie:** {result['category']}\n")
+        write(f"- **Sicher löschbar:** {'✅ Ja' if result['safe_delete'] else '❌ Nein'}\n")
+        
+        if result['requires_admin']:
+            write("- **Benötigt Admin:** Ja\n")
+        
+        if result['description']:
+            write(f"- **Beschreibung:** {result['description']}\n")
+        
+        if result['warning']:
+            write(f"- **⚠ Warnung:** {result['warning']}\n")
+        
+        # Show first path
+        if result['paths']:
+            write(f"- **Pfad:** `{result['paths'][0]}`\n")
+        
+        if result['shared_with']:
+            write(f"- **Teilt Verzeichnisse mit:** {', '.join(result['shared_with'])} "
+                  f"(jede Datei wird nur einmal gezählt)\n")
+        
+        if len(result['errors']) > 0:
+            write(f"- **Fehler:** {len(result['errors'])} Zugriffsprobleme")
+            by_errno = getattr(result['errors'], 'by_errno', None)
+            if by_errno is not None:
+                write(" (" + ", ".join(f"{name}: {count:,}" for name, count in by_errno().items()) + ")")
+            write("\n")
+        
+        if result['files'] and result.get('size_histogram'):
+            write("- **Größenverteilung:** " + _format_buckets(result['size_histogram']) + "\n")
+            write("- **Alter:** " + _format_buckets(result['age_histogram']) + "\n")
+        
+        if result.get('largest_files'):
+            write("- **Größte Dateien:**\n")
+            for path, size in result['largest_files']:
+                write(f"  - `{path}` ({format_size(size)})\n")
+        
+        if result.get('largest_dirs'):
+            write("- **Größte Verzeichnisse** (direkt enthaltene Dateien):\n")
+            for path, size, _ in result['largest_dirs']:
+                write(f"  - `{path}` ({format_size(size)})\n")
+        
+        write("\n")
+
+
+def _format_buckets(buckets) -> str:
+    """Render the non-empty (label, count, bytes) buckets of a histogram on one line"""
+    return " · ".join(f"{label}: {count:,} ({format_size(nbytes)})"
+                      for label, count, nbytes in buckets if count)
+
+
+# ==================== MACHINE-READABLE EXPORT ====================
+
+# Compact inventory file: magic, then one block per location
+INVENTORY_MAGIC = b'WTCINV\x00\x01'
+
+
+def result_record(result: dict, host: str, timestamp: str) -> dict:
+    """
+    Build the JSON Lines record of one scan result (all result fields plus host/timestamp)
+    
+    'errors' is replaced by the full error count, the counts per errno
+    name and the sample messages, since an ErrorCollector only keeps
+    ERROR_SAMPLE_LIMIT messages.
+    """
+    record = {'host': host, 'timestamp': timestamp}
+    record.update(result)
+    errors = record.pop('errors', None) or []
+    record['error_count'] = len(errors)
+    record['errors_by_errno'] = errors.by_errno() if isinstance(errors, ErrorCollector) else {}
+    record['error_samples'] = list(errors)
+    return record
+
+
+def write_jsonl(path: str, results: Iterable[dict], host: str, timestamp: str) -> int:
+    """
+    Write one JSON object per location result
+    
+    Args:
+        path: Output file
+        results: Scan result dictionaries (as returned by scan_location)
+        host: Host name stored with every record
+        timestamp: Scan timestamp stored with every record
+        
+    Returns:
+        Number of records written
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8', buffering=REPORT_BUFFER_SIZE) as f:
+        for result in results:
+            f.write(json.dumps(result_record(result, host, timestamp),
+                               ensure_ascii=False, separators=(',', ':'), default=_json_default))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def _json_default(value):
+    """Serialize values json does not know (sets, iterables such as error collections)"""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    try:
+        return list(value)
+    except TypeError:
+        return str(value)
+
+
+def merge_jsonl_files(paths: Iterable[str]) -> dict:
+    """
+    Merge JSON Lines exports of many hosts into fleet totals
+    
+    Every (host, location) pair counts once: if the same host shows up
+    again (an export passed twice, or several scans of one host), only
+    the record with the latest timestamp is used and the others are
+    counted in 'duplicates'.
+    
+    Returns:
+        Dictionary with 'hosts', 'total_size', 'total_files', 'duplicates'
+        and per-location totals in 'locations' (name -> size, files, hosts)
+    """
+    fleet = {'hosts': 0, 'total_size': 0, 'total_files': 0, 'duplicates': 0, 'locations': {}}
+    locations = fleet['locations']
+    latest = {}  # (host, name) -> (timestamp, exists, size, files)
+    
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', buffering=REPORT_BUFFER_SIZE) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                key = (record.get('host'), record['name'])
+                entry = (record.get('timestamp') or '', record.get('exists'),
+                         record.get('size', 0), record.get('files', 0))
+                previous = latest.get(key)
+                if previous is not None:
+                    fleet['duplicates'] += 1
+                    if previous[0] >= entry[0]:
+                        continue
+                latest[key] = entry
+    
+    hosts = set()
+    for (host, name), (_, exists, size, files) in latest.items():
+        hosts.add(host)
+        if not exists:
+            continue
+        
+        stats = locations.get(name)
+        if stats is None:
+            stats = locations[name] = {'size': 0, 'files': 0, 'hosts': 0}
+        stats['size'] += size
+        stats['files'] += files
+        stats['hosts'] += 1
+        fleet['total_size'] += size
+        fleet['total_files'] += files
+    
+    fleet['hosts'] = len(hosts)
+    return fleet
+
+
+def _write_varint(buffer: bytearray, value: int):
+    """Append an unsigned LEB128 varint"""
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """Read an unsigned LEB128 varint, returns (value, new position)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def write_inventory_binary(path: str, inventories: Dict[str, Iterable[Tuple[str, int, int]]]) -> int:
+    """
+    Write per-file inventories in a compact binary encoding
+    
+    Per location: varint name length, name, varint record count, then per
+    file: varint length of the prefix shared with the previous path,
+    varint suffix length, suffix bytes, varint size and the zigzag varint
+    delta of mtime_ns to the previous file. Sorted cache trees share long
+    prefixes, so a record typically takes a few dozen bytes.
+    
+    Args:
+        path: Output file
+        inventories: location name -> iterable of (path, size, mtime_ns) (e.g. FileInventory)
+        
+    Returns:
+        Number of file records written
+    """
+    total = 0
+    with open(path, 'wb', buffering=REPORT_BUFFER_SIZE) as f:
+        f.write(INVENTORY_MAGIC)
+        for name, records in inventories.items():
+            records = list(records) if not hasattr(records, '__len__') else records
+            header = bytearray()
+            encoded_name = name.encode('utf-8')
+            _write_varint(header, len(encoded_name))
+            header += encoded_name
+            _write_varint(header, len(records))
+            f.write(header)
+            
+            previous = b''
+            previous_mtime = 0
+            chunk = bytearray()
+            for file_path, size, mtime_ns in records:
+                encoded = file_path.encode('utf-8', 'surrogateescape')
+                limit = min(len(encoded), len(previous))
+                shared = 0
+                while shared < limit and encoded[shared] == previous[shared]:
+                    shared += 1
+                _write_varint(chunk, shared)
+                _write_varint(chunk, len(encoded) - shared)
+                chunk += encoded[shared:]
+                _write_varint(chunk, size)
+                delta = mtime_ns - previous_mtime
+                _write_varint(chunk, (delta << 1) ^ (delta >> 63))  # zigzag
+                previous = encoded
+                previous_mtime = mtime_ns
+                total += 1
+                
+                if len(chunk) >= REPORT_BUFFER_SIZE:
+                    f.write(chunk)
+                    chunk = bytearray()
+            f.write(chunk)
+    
+    return total
+
+
+def read_inventory_binary(path: str) -> Iterator[Tuple[str, str, int, int]]:
+    """
+    Read a file written by write_inventory_binary
+    
+    Yields:
+        (location name, file path, size, mtime_ns)
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    
+    if not data.startswith(INVENTORY_MAGIC):
+        raise ValueError(f"Kein gültiges Inventar-Format: {path}")
+    
+    pos = len(INVENTORY_MAGIC)
+    while pos < len(data):
+        length, pos = _read_varint(data, pos)
+        name = data[pos:pos + length].decode('utf-8')
+        pos += length
+        count, pos = _read_varint(data, pos)
+        
+        previous = b''
+        mtime_ns = 0
+        for _ in range(count):
+            shared, pos = _read_varint(data, pos)
+            length, pos = _read_varint(data, pos)
+            encoded = previous[:shared] + data[pos:pos + length]
+            pos += length
+            size, pos = _read_varint(data, pos)
+            zigzag, pos = _read_varint(data, pos)
+            mtime_ns += (zigzag >> 1) ^ -(zigzag & 1)
+            previous = encoded
+            yield name, encoded.decode('utf-8', 'surrogateescape'), size, mtime_ns
+
+
+def main():
+    """Merge JSON Lines exports of several hosts: python report.py host1.jsonl host2.jsonl ..."""
+    if len(sys.argv) < 2:
+        print("Verwendung: python report.py <export.jsonl> [<export.jsonl> ...]")
+        sys.exit(2)
+    
+    fleet = merge_jsonl_files(sys.argv[1:])
+    if fleet['duplicates']:
+        print(f"⚠ {fleet['duplicates']:,} doppelte Datensätze (Host/Location) ignoriert, "
+              f"jeweils der neueste Zeitstempel zählt", file=sys.stderr)
+    print(f"Hosts: {fleet['hosts']}")
+    print(f"Gesamt: {format_size(fleet['total_size'])} in {fleet['total_files']:,} Dateien\n")
+    for name, stats in sorted(fleet['locations'].items(), key=lambda x: x[1]['size'], reverse=True):
+        print(f"{name:<45} {format_size(stats['size']):>12} {stats['files']:>12,} "
+              f"({stats['hosts']} Hosts)")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,269 @@ Utility functions for Windows Temp File Cleaner
 Includes process checking, service management, and file operations
 """
 
+import codecs
+import concurrent.futures
+import csv
+import functools
+import heapq
+import io
+import json
+import locale
 import os
+import re
+import struct
 import subprocess
+import sys
+import tempfile
+import threading
 import time
-from typing import List, Tuple, Optional
+import weakref
+from array import array
+from bisect import bisect_right
+from collections import deque
+from typing import (
+    TYPE_CHECKING, Any, Callable, FrozenSet, Iterable, Iterator, List, Set, Tuple, Optional
+)
 
+from metrics import metrics
+from records import DirAggregate, ErrorCollector, FileEntry
 
-class ProcessManager:
-    """Manages process checking and termination"""
+if TYPE_CHECKING:
+    import asyncio  # Annotations only, imported lazily at runtime
+
+
+# Seconds a process table snapshot is shared between checks
+PROCESS_SNAPSHOT_TTL = 5.0
+
+# Pending directories required before a tree walk switches to the thread pool
+PARALLEL_WALK_MIN_DIRS = 64
+
+# Estimated in-memory size of all live FileInventory instances together before
+# the largest one spills to disk
+INVENTORY_MEMORY_LIMIT = 16 * 1024 * 1024
+
+# Persistent scan cache bounds; an entry with files takes ~330 bytes of JSON
+# on average (up to TOP_N_ENTRIES names plus histogram), so ~16 MB on disk
+SCAN_CACHE_MAX_ENTRIES = 50_000
+SCAN_CACHE_MAX_AGE = 7 * 24 * 3600  # seconds before a directory is walked again anyway
+
+# Bytes read from a command's stdout at a time (lines are split on \r and \n,
+# so DISM's \r-only progress bar streams without any line length limit)
+COMMAND_READ_CHUNK = 64 * 1024
+
+# Deferred retries of locked files: first delay, doubled after every pass,
+# and the longest total time spent waiting per delete call (seconds)
+DELETE_RETRY_BASE_DELAY = 0.1
+DELETE_RETRY_MAX_WAIT = 10.0
+# Longest pause between two retry passes, so late passes still happen
+DELETE_RETRY_MAX_DELAY = 2.0
+
+# Location deletions running at the same time on one volume (st_dev)
+VOLUME_DELETE_CONCURRENCY = 2
+
+# Largest files and directories kept per location
+TOP_N_ENTRIES = 10
+
+# File age buckets of FileHistogram in hours (< 1 day, < 7 days, < 30 days, older)
+AGE_BUCKET_HOURS = (24, 7 * 24, 30 * 24)
+HOUR_NS = 3600 * 1_000_000_000
+
+
+class CommandRunner:
+    """
+    Asynchronous runner for external commands (net, sc, takeown, icacls, Dism.exe)
+    
+    Commands run on an asyncio event loop in a background thread, so
+    several commands can run concurrently while the calling threads keep
+    deleting files. Each command supports a timeout, cancellation through
+    the returned Future, and streaming of stdout lines as they arrive.
+    
+    asyncio is imported on first use; scans never start a command, so
+    scan-only runs do not pay for it.
+    """
+    
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def _ensure_loop(self) -> 'asyncio.AbstractEventLoop':
+        """Start the event loop thread on first use"""
+        import asyncio
+        with self._lock:
+            if self._loop is None:
+                if sys.platform == 'win32':
+                    # Subprocess support on Windows needs the proactor loop
+                    self._loop = asyncio.ProactorEventLoop()
+                else:
+                    self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name='CommandRunner', daemon=True
+                )
+                self._thread.start()
+            return self._loop
+    
+    async def run_async(self, cmd: List[str], timeout: Optional[float] = None,
+                        on_line: Optional[Callable[[str], None]] = None) -> subprocess.CompletedProcess:
+        """
+        Run a command on the runner's event loop
+        
+        Args:
+            cmd: Command and arguments
+            timeout: Seconds before the process is killed (None = no limit)
+            on_line: Called with every stdout line (without line break) as it arrives;
+                     lines end at \n or \r (progress bars), any length
+            
+        Returns:
+            CompletedProcess with decoded stdout and stderr
+            
+        Raises:
+            subprocess.TimeoutExpired: If the timeout expired (the process is killed)
+        """
+        import asyncio
+        encoding = locale.getpreferredencoding(False)
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        
+        stdout_parts = []
+        
+        async def communicate() -> bytes:
+            stderr_task = asyncio.ensure_future(proc.stderr.read())
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            pending = ''
+            while True:
+                chunk = await proc.stdout.read(COMMAND_READ_CHUNK)
+                text = decoder.decode(chunk, final=not chunk)
+                stdout_parts.append(text)
+                if on_line is not None:
+                    # Progress bars rewrite their line with \r, report every state
+                    pieces = re.split(r'[\r\n]', pending + text)
+                    pending = pieces.pop() if chunk else ''
+                    for piece in pieces:
+                        if piece:
+                            on_line(piece)
+                if not chunk:
+                    break
+            stderr = await stderr_task
+            await proc.wait()
+            return stderr
+        
+        try:
+            stderr = await asyncio.wait_for(communicate(), timeout)
+        except asyncio.TimeoutError:
+            await self._kill(proc)
+            raise subprocess.TimeoutExpired(cmd, timeout, output=''.join(stdout_parts))
+        except BaseException:
+            # Cancelled, or any other failure: never leave the child running unreaped
+            await self._kill(proc)
+            raise
+        
+        return subprocess.CompletedProcess(
+            cmd, proc.returncode, ''.join(stdout_parts), stderr.decode(encoding, errors='replace')
+        )
     
     @staticmethod
-    def is_process_running(process_names: List[str]) -> bool:
+    async def _kill(proc):
+        """Kill a process that may already have exited and reap it"""
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+    
+    def submit(self, cmd: List[str], timeout: Optional[float] = None,
+               on_line: Optional[Callable[[str], None]] = None) -> concurrent.futures.Future:
+        """
+        Start a command without waiting for it
+        
+        Returns:
+            Future resolving to the CompletedProcess; future.cancel() kills the process
+        """
+        import asyncio
+        return asyncio.run_coroutine_threadsafe(
+            self.run_async(cmd, timeout, on_line), self._ensure_loop()
+        )
+    
+    def run(self, cmd: List[str], timeout: Optional[float] = None,
+            on_line: Optional[Callable[[str], None]] = None) -> subprocess.CompletedProcess:
+        """Run a command and wait for it (blocks only the calling thread)"""
+        if not metrics.enabled:
+            return self.submit(cmd, timeout, on_line).result()
+        start = time.perf_counter()
+        try:
+            return self.submit(cmd, timeout, on_line).result()
+        finally:
+            metrics.record_subprocess(time.perf_counter() - start)
+
+
+# Shared by ProcessManager, ServiceManager, PermissionManager and DISMOperations
+command_runner = CommandRunner()
+
+
+def tasklist_backend() -> Set[str]:
+    """
+    Default process backend: image names from tasklist, lowercased
+    
+    Returns an empty set if tasklist fails, raises if it cannot be started.
+    """
+    result = command_runner.run(['tasklist', '/FO', 'CSV', '/NH'])
+    
+    if result.returncode != 0:
+        return set()
+    
+    # First CSV column is the image name ("chrome.exe","1234","Console",...)
+    return {row[0].lower() for row in csv.reader(io.StringIO(result.stdout)) if row}
+
+
+class ProcessManager:
+    """
+    Manages process checking and termination
+    
+    The process table is read once and shared by all checks for
+    PROCESS_SNAPSHOT_TTL seconds, so a cleanup pass over many locations
+    starts a single tasklist. The backend is pluggable (set_backend) so
+    tests can inject a fake process list on systems without tasklist.
+    """
+    
+    _backend: Callable[[], Set[str]] = staticmethod(tasklist_backend)
+    _snapshot: Optional[FrozenSet[str]] = None
+    _snapshot_time = 0.0
+    _lock = threading.Lock()
+    
+    @classmethod
+    def set_backend(cls, backend: Callable[[], Set[str]]):
+        """Replace the process source (a callable returning image names) and drop the snapshot"""
+        with cls._lock:
+            cls._backend = staticmethod(backend)
+            cls._snapshot = None
+    
+    @classmethod
+    def invalidate(cls):
+        """Force the next check to take a fresh snapshot"""
+        with cls._lock:
+            cls._snapshot = None
+    
+    @classmethod
+    def snapshot(cls, ttl: float = PROCESS_SNAPSHOT_TTL) -> FrozenSet[str]:
+        """
+        Get the lowercased image names of all running processes
+        
+        Args:
+            ttl: Maximum age in seconds of a reused snapshot
+            
+        Returns:
+            Set of running image names (exceptions from the backend propagate)
+        """
+        with cls._lock:
+            now = time.monotonic()
+            if cls._snapshot is None or now - cls._snapshot_time > ttl:
+                cls._snapshot = frozenset(name.lower() for name in cls._backend())
+                cls._snapshot_time = now
+            return cls._snapshot
+    
+    @classmethod
+    def is_process_running(cls, process_names: List[str]) -> bool:
         """
         Check if any of the specified processes are running
         
@@ -26,66 +278,34 @@ class ProcessManager:
             True if any process is running, False otherwise
         """
         try:
-            # Use tasklist command to get running processes
-            result = subprocess.run(
-                ['tasklist', '/FO', 'CSV', '/NH'],
-                capture_output=True,
-                text=True,
-                check=False
-            )
-            
-            if result.returncode != 0:
-                return False
-                
-            running_processes = result.stdout.lower()
-            
-            for process_name in process_names:
-                if process_name.lower() in running_processes:
-                    return True
-                    
-            return False
+            running_processes = cls.snapshot()
+            return any(name.lower() in running_processes for name in process_names)
             
         except Exception as e:
             print(f"Fehler beim Prozess-Check: {e}")
             return True  # Assume process is running on error (safer)
     
-    @staticmethod
-    def get_running_processes(process_names: List[str]) -> List[str]:
+    @classmethod
+    def get_running_processes(cls, process_names: List[str]) -> List[str]:
         """
         Get list of which processes from the list are currently running
         
         Returns:
             List of running process names
         """
-        running = []
         try:
-            result = subprocess.run(
-                ['tasklist', '/FO', 'CSV', '/NH'],
-                capture_output=True,
-                text=True,
-                check=False
-            )
-            
-            if result.returncode != 0:
-                return running
-                
-            running_processes = result.stdout.lower()
-            
-            for process_name in process_names:
-                if process_name.lower() in running_processes:
-                    running.append(process_name)
-                    
+            running_processes = cls.snapshot()
         except Exception:
-            pass
-            
-        return running
+            return []
+        
+        return [name for name in process_names if name.lower() in running_processes]
 
 
-class ServiceManager:
-    """Manages Windows service operations"""
+class NetServiceBackend:
+    """Default service backend using net start/stop and sc query"""
     
     @staticmethod
-    def stop_service(service_name: str) -> Tuple[bool, str]:
+    def stop(service_name: str) -> Tuple[bool, str]:
         """
         Stop a Windows service
         
@@ -96,12 +316,7 @@ class ServiceManager:
             Tuple of (success, message)
         """
         try:
-            result = subprocess.run(
-                ['net', 'stop', service_name],
-                capture_output=True,
-                text=True,
-                check=False
-            )
+            result = command_runner.run(['net', 'stop', service_name])
             
             if result.returncode == 0:
                 return True, f"Service '{service_name}' erfolgreich gestoppt"
@@ -114,7 +329,7 @@ class ServiceManager:
             return False, f"Exception beim Stoppen von '{service_name}': {str(e)}"
     
     @staticmethod
-    def start_service(service_name: str) -> Tuple[bool, str]:
+    def start(service_name: str) -> Tuple[bool, str]:
         """
         Start a Windows service
         
@@ -125,12 +340,7 @@ class ServiceManager:
             Tuple of (success, message)
         """
         try:
-            result = subprocess.run(
-                ['net', 'start', service_name],
-                capture_output=True,
-                text=True,
-                check=False
-            )
+            result = command_runner.run(['net', 'start', service_name])
             
             if result.returncode == 0:
                 return True, f"Service '{service_name}' erfolgreich gestartet"
@@ -143,15 +353,10 @@ class ServiceManager:
             return False, f"Exception beim Starten von '{service_name}': {str(e)}"
     
     @staticmethod
-    def is_service_running(service_name: str) -> bool:
+    def is_running(service_name: str) -> bool:
         """Check if a service is currently running"""
         try:
-            result = subprocess.run(
-                ['sc', 'query', service_name],
-                capture_output=True,
-                text=True,
-                check=False
-            )
+            result = command_runner.run(['sc', 'query', service_name])
             
             return "RUNNING" in result.stdout
             
@@ -159,6 +364,54 @@ class ServiceManager:
             return False
 
 
+class ServiceManager:
+    """
+    Manages Windows service operations
+    
+    Commands go through a pluggable backend (NetServiceBackend by default)
+    providing stop(name), start(name) and is_running(name), so service
+    orchestration can be exercised with a fake backend on Linux.
+    """
+    
+    _backend = NetServiceBackend
+    
+    @classmethod
+    def set_backend(cls, backend):
+        """Replace the service backend (object with stop/start/is_running)"""
+        cls._backend = backend
+    
+    @classmethod
+    def stop_service(cls, service_name: str) -> Tuple[bool, str]:
+        """
+        Stop a Windows service
+        
+        Args:
+            service_name: Name of the service to stop
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        return cls._backend.stop(service_name)
+    
+    @classmethod
+    def start_service(cls, service_name: str) -> Tuple[bool, str]:
+        """
+        Start a Windows service
+        
+        Args:
+            service_name: Name of the service to start
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        return cls._backend.start(service_name)
+    
+    @classmethod
+    def is_service_running(cls, service_name: str) -> bool:
+        """Check if a service is currently running"""
+        return cls._backend.is_running(service_name)
+
+
 class PermissionManager:
     """Manages file and folder permissions"""
     
@@ -186,20 +439,10 @@ class PermissionManager:
         """
         try:
             # Take ownership
-            result1 = subprocess.run(
-                ['takeown', '/F', path, '/R', '/A', '/D', 'Y'],
-                capture_output=True,
-                text=True,
-                check=False
-            )
+            result1 = command_runner.run(['takeown', '/F', path, '/R', '/A', '/D', 'Y'])
             
             # Grant full permissions to administrators
-            result2 = subprocess.run(
-                ['icacls', path, '/T', '/grant', 'administrators:F', '/C'],
-                capture_output=True,
-                text=True,
-                check=False
-            )
+            result2 = command_runner.run(['icacls', path, '/T', '/grant', 'administrators:F', '/C'])
             
             if result1.returncode == 0 and result2.returncode == 0:
                 return True, "Berechtigungen erfolgreich gesetzt"
@@ -215,124 +458,1424 @@ class PermissionManager:
             return False, f"Exception: {str(e)}"
 
 
+class TreeWalker:
+    """
+    Directory tree traversal with an optional work-stealing thread pool
+    
+    The walk is driven by a visit callback that processes one directory
+    and returns the subdirectories to descend into. Every worker owns a
+    deque of pending directories: it pops from its own tail (depth-first,
+    good cache locality) and steals from the head of another worker's
+    deque when it runs dry, so one huge subtree is spread over all workers.
+    
+    Small trees never pay for the pool: the walk starts serially and only
+    hands the remaining directories to the workers once the pending
+    frontier reaches min_parallel_dirs.
+    """
+    
+    def __init__(self, workers: int = 1, min_parallel_dirs: int = PARALLEL_WALK_MIN_DIRS):
+        self.workers = max(1, workers)
+        self.min_parallel_dirs = max(1, min_parallel_dirs)
+    
+    def walk(self, root: str, visit: Callable[[str, Any], List[str]],
+             make_acc: Callable[[], Any]) -> List[Any]:
+        """
+        Walk the tree below root
+        
+        Args:
+            root: Directory to start at
+            visit: Called as visit(dirpath, acc), returns subdirectories to walk
+            make_acc: Creates the per-worker accumulator passed to visit
+            
+        Returns:
+            List of accumulators (one per worker that took part) for the caller to merge
+        """
+        acc = make_acc()
+        stack = [root]
+        
+        # Serial phase: small trees finish here without starting any threads
+        while stack:
+            if self.workers > 1 and len(stack) >= self.min_parallel_dirs:
+                return [acc] + self._walk_parallel(stack, visit, make_acc)
+            stack.extend(visit(stack.pop(), acc))
+        
+        return [acc]
+    
+    def _walk_parallel(self, pending: List[str], visit: Callable[[str, Any], List[str]],
+                       make_acc: Callable[[], Any]) -> List[Any]:
+        """Distribute the pending directories over work-stealing workers"""
+        queues = [deque() for _ in range(self.workers)]
+        for i, dirpath in enumerate(pending):
+            queues[i % self.workers].append(dirpath)
+        
+        # pushes counts the batches of subdirectories queued so far; idle
+        # workers sleep on work_added until it changes or the walk ends
+        state = {'pending': len(pending), 'pushes': 0, 'error': None}
+        lock = threading.Lock()
+        work_added = threading.Condition(lock)
+        done = threading.Event()
+        accs = [make_acc() for _ in range(self.workers)]
+        
+        def steal(own: int) -> Optional[str]:
+            for offset in range(1, self.workers):
+                try:
+                    return queues[(own + offset) % self.workers].popleft()
+                except IndexError:
+                    continue
+            return None
+        
+        def worker(index: int):
+            own = queues[index]
+            acc = accs[index]
+            while True:
+                seen = state['pushes']
+                try:
+                    dirpath = own.pop()
+                except IndexError:
+                    dirpath = steal(index)
+                    if dirpath is None:
+                        with work_added:
+                            while state['pushes'] == seen and not done.is_set():
+                                work_added.wait()
+                        if done.is_set():
+                            return
+                        continue
+                
+                if done.is_set():
+                    return  # Another worker failed
+                try:
+                    subdirs = visit(dirpath, acc)
+                except BaseException as e:
+                    # Stop all workers; the caller gets the error like in a serial walk
+                    with work_added:
+                        if state['error'] is None:
+                            state['error'] = e
+                        done.set()
+                        work_added.notify_all()
+                    return
+                with work_added:
+                    # Register children before retiring this directory so the
+                    # counter can only reach zero once the whole tree is done
+                    state['pending'] += len(subdirs) - 1
+                    if subdirs:
+                        own.extend(subdirs)
+                        state['pushes'] += 1
+                        work_added.notify(len(subdirs))
+                    elif state['pending'] == 0:
+                        done.set()
+                        work_added.notify_all()
+        
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True)
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        if state['error'] is not None:
+            raise state['error']
+        return accs
+
+
+class InventoryBudget:
+    """
+    Memory limit shared by all FileInventory instances
+    
+    An interactive run keeps one inventory per deletable location until
+    the delete phase consumes it, so the limit applies to their sum. Once
+    the estimated total exceeds limit, the inventory holding the most
+    in-memory records spills them to its temp file.
+    """
+    
+    def __init__(self, limit: int = INVENTORY_MEMORY_LIMIT):
+        self.limit = limit
+        # Weak, so an inventory dropped without close() stops counting
+        self._inventories = weakref.WeakSet()
+        self._lock = threading.Lock()
+    
+    @property
+    def total(self) -> int:
+        """Estimated in-memory size of all registered inventories"""
+        with self._lock:
+            return sum(inventory.memory for inventory in self._inventories)
+    
+    def register(self, inventory: 'FileInventory'):
+        with self._lock:
+            self._inventories.add(inventory)
+    
+    def unregister(self, inventory: 'FileInventory'):
+        with self._lock:
+            self._inventories.discard(inventory)
+    
+    def check(self):
+        """
+        Spill the largest inventories until the total fits the limit again
+        
+        Must be called without holding an inventory lock: the spilled
+        inventory may be another one than the caller.
+        """
+        while True:
+            with self._lock:
+                inventories = list(self._inventories)
+            sizes = [inventory.memory for inventory in inventories]
+            if sum(sizes) <= self.limit:
+                return
+            largest = inventories[sizes.index(max(sizes))]
+            if not largest.spill():
+                return
+
+
+class FileInventory:
+    """
+    Compact per-location list of scanned files (path, size, mtime)
+    
+    Filled during the scan so the delete phase can work from the recorded
+    files instead of walking the tree a second time. Sizes and mtimes are
+    kept in typed arrays; the in-memory records of all inventories share
+    one InventoryBudget (by default inventory_budget), and the largest
+    inventory spills to an anonymous temp file when it is exceeded.
+    Directories are kept separately so they can be removed afterwards.
+    """
+    
+    # Record header in the spill file: size, mtime_ns, encoded path length
+    _RECORD = struct.Struct('<qqI')
+    # Rough per-record overhead of the in-memory lists and arrays
+    _RECORD_OVERHEAD = 80
+    
+    def __init__(self, budget: Optional[InventoryBudget] = None):
+        self.budget = budget if budget is not None else inventory_budget
+        self.dirs = []
+        self._paths = []
+        self._sizes = array('q')
+        self._mtimes = array('q')
+        self._memory = 0
+        self._spill = None
+        self._spilled = 0
+        self._lock = threading.Lock()
+        self.budget.register(self)
+    
+    @property
+    def memory(self) -> int:
+        """Estimated size of the records still held in memory"""
+        return self._memory
+    
+    def add_files(self, records: List[Tuple[str, int, int]]):
+        """Add a batch of (path, size, mtime_ns) records (thread-safe)"""
+        with self._lock:
+            for path, size, mtime_ns in records:
+                self._paths.append(path)
+                self._sizes.append(size)
+                self._mtimes.append(mtime_ns)
+                self._memory += len(path) + self._RECORD_OVERHEAD
+        # Outside the lock, the budget may spill this or another inventory
+        self.budget.check()
+    
+    def spill(self) -> bool:
+        """
+        Move the in-memory records to the spill file (thread-safe)
+        
+        Returns:
+            False if there was nothing to spill
+        """
+        with self._lock:
+            if not self._paths:
+                return False
+            self._spill_to_disk()
+            return True
+    
+    def add_dirs(self, dirs: List[str]):
+        """Add directories that should be removed once their files are gone"""
+        with self._lock:
+            self.dirs.extend(dirs)
+    
+    def _spill_to_disk(self):
+        """Move the in-memory records to the spill file"""
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(prefix='wtc_inventory_')
+        self._spill.seek(0, os.SEEK_END)
+        
+        chunks = []
+        for path, size, mtime_ns in zip(self._paths, self._sizes, self._mtimes):
+            encoded = path.encode('utf-8', 'surrogateescape')
+            chunks.append(self._RECORD.pack(size, mtime_ns, len(encoded)))
+            chunks.append(encoded)
+        self._spill.write(b''.join(chunks))
+        
+        self._spilled += len(self._paths)
+        self._paths = []
+        self._sizes = array('q')
+        self._mtimes = array('q')
+        self._memory = 0
+    
+    def __len__(self) -> int:
+        return self._spilled + len(self._paths)
+    
+    def __iter__(self) -> Iterator[FileEntry]:
+        """
+        Yield a FileEntry (path, size, mtime_ns) for every recorded file
+        
+        Reading hands the inventory to the delete phase: it leaves the
+        budget first, so no other inventory can spill it mid-iteration.
+        """
+        self.budget.unregister(self)
+        if self._spill is not None:
+            self._spill.flush()
+            self._spill.seek(0)
+            header_size = self._RECORD.size
+            for _ in range(self._spilled):
+                size, mtime_ns, length = self._RECORD.unpack(self._spill.read(header_size))
+                path = self._spill.read(length).decode('utf-8', 'surrogateescape')
+                yield FileEntry(path, size, mtime_ns)
+        
+        yield from map(FileEntry._make, zip(self._paths, self._sizes, self._mtimes))
+    
+    def close(self):
+        """Release the memory and the spill file"""
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+            self.dirs = []
+            self._paths = []
+            self._sizes = array('q')
+            self._mtimes = array('q')
+            self._memory = 0
+            self._spilled = 0
+        self.budget.unregister(self)
+
+
+# Shared by all inventories of a run (main.py keeps one per deletable location)
+inventory_budget = InventoryBudget()
+
+
+class LargestEntries:
+    """
+    Bounded index of the largest files and directories seen by a walk
+    
+    Keeps two min-heaps of at most limit (size, path) pairs, so adding an
+    entry costs O(log limit) and no full listing is held in memory.
+    Directories are ranked by the bytes of the files directly inside them,
+    which points at the folders that actually hold the data rather than
+    at every ancestor of a large file.
+    """
+    
+    def __init__(self, limit: int = TOP_N_ENTRIES):
+        self.limit = limit
+        self._files = []
+        self._dirs = []
+    
+    @staticmethod
+    def _push(heap: list, limit: int, item: tuple):
+        # item[0] is the size the heap is ordered by
+        if len(heap) < limit:
+            heapq.heappush(heap, item)
+        elif item[0] > heap[0][0]:
+            heapq.heapreplace(heap, item)
+    
+    def add_file(self, path: str, size: int):
+        """Offer a file to the index"""
+        self._push(self._files, self.limit, (size, path))
+    
+    def add_dir(self, path: str, size: int, files: int):
+        """Offer a directory with its direct file bytes and count to the index"""
+        if size > 0:
+            self._push(self._dirs, self.limit, (size, path, files))
+    
+    def merge(self, other: 'LargestEntries'):
+        """Fold the entries of another index (e.g. of a worker thread) into this one"""
+        for item in other._files:
+            self._push(self._files, self.limit, item)
+        for item in other._dirs:
+            self._push(self._dirs, self.limit, item)
+    
+    def largest_files(self) -> List[Tuple[str, int]]:
+        """Return (path, size) of the largest files, largest first"""
+        return [(path, size) for size, path in sorted(self._files, reverse=True)]
+    
+    def largest_dirs(self) -> List[DirAggregate]:
+        """Return the largest directories (direct bytes and files), largest first"""
+        return [DirAggregate(path, size, files) for size, path, files in sorted(self._dirs, reverse=True)]
+
+
+class FileHistogram:
+    """
+    Size and age distribution of the files of a location
+    
+    Sizes fall into log-scale buckets (< 1 KB, then factor 4 up to >= 1 GB),
+    ages into AGE_BUCKET_HOURS measured to the hour against the scan start.
+    Every bucket holds a file count and a byte total in fixed int64 arrays,
+    so a histogram costs the same for ten files or ten million.
+    
+    Walks collect per directory and fold the result in with add_dir():
+    sizes as (bucket, count, bytes) and mtimes as (hour, count, bytes),
+    where all hours older than the last age bucket are collapsed into
+    hour 0. The scan cache keeps this per-directory form, so ages stay
+    correct when a cached directory is read again days later.
+    """
+    
+    SIZE_LABELS = ('< 1 KB', '< 4 KB', '< 16 KB', '< 64 KB', '< 256 KB', '< 1 MB',
+                   '< 4 MB', '< 16 MB', '< 64 MB', '< 256 MB', '< 1 GB', '≥ 1 GB')
+    AGE_LABELS = ('< 1 Tag', '< 7 Tage', '< 30 Tage', 'älter')
+    
+    def __init__(self, now: Optional[float] = None):
+        self.now = time.time() if now is None else now
+        self.now_hour = int(self.now) // 3600
+        # mtime hours below this are collapsed into hour 0 ("older")
+        self.cutoff_hour = self.now_hour - AGE_BUCKET_HOURS[-1]
+        self.size_counts = array('q', bytes(8 * len(self.SIZE_LABELS)))
+        self.size_bytes = array('q', bytes(8 * len(self.SIZE_LABELS)))
+        self.age_counts = array('q', bytes(8 * len(self.AGE_LABELS)))
+        self.age_bytes = array('q', bytes(8 * len(self.AGE_LABELS)))
+    
+    @staticmethod
+    def size_bucket(size: int) -> int:
+        """Return the size bucket index of a file size"""
+        if size < 1024:
+            return 0
+        return min(11, (size.bit_length() - 9) >> 1)
+    
+    def add_dir(self, sizes: Iterable[Tuple[int, int, int]], hours: Iterable[Tuple[int, int, int]]):
+        """
+        Add the files of one directory
+        
+        Args:
+            sizes: (size bucket, count, bytes) triples
+            hours: (mtime hour, count, bytes) triples, hour 0 for old files
+        """
+        for bucket, count, nbytes in sizes:
+            self.size_counts[bucket] += count
+            self.size_bytes[bucket] += nbytes
+        for hour, count, nbytes in hours:
+            bucket = bisect_right(AGE_BUCKET_HOURS, self.now_hour - hour)
+            self.age_counts[bucket] += count
+            self.age_bytes[bucket] += nbytes
+    
+    def add_file(self, size: int, mtime_ns: int):
+        """Add a single file"""
+        self.add_dir([(self.size_bucket(size), 1, size)], [(mtime_ns // HOUR_NS, 1, size)])
+    
+    def merge(self, other: 'FileHistogram'):
+        """Fold another histogram of the same scan (e.g. of a worker thread) into this one"""
+        for mine, theirs in ((self.size_counts, other.size_counts),
+                             (self.size_bytes, other.size_bytes),
+                             (self.age_counts, other.age_counts),
+                             (self.age_bytes, other.age_bytes)):
+            for i, value in enumerate(theirs):
+                mine[i] += value
+    
+    def size_distribution(self) -> List[Tuple[str, int, int]]:
+        """Return (label, count, bytes) for every size bucket"""
+        return list(zip(self.SIZE_LABELS, self.size_counts, self.size_bytes))
+    
+    def age_distribution(self) -> List[Tuple[str, int, int]]:
+        """Return (label, count, bytes) for every age bucket"""
+        return list(zip(self.AGE_LABELS, self.age_counts, self.age_bytes))
+
+
+class ScanCache:
+    """
+    Persistent per-directory scan cache
+    
+    Stores the direct file totals, subdirectory names, largest direct
+    files and size/age histogram of every walked directory, keyed by
+    path and validated by mtime and inode (file id on Windows). A
+    directory whose mtime and inode are unchanged has had no entries
+    added, removed or renamed, so its cached totals are reused and
+    only its subdirectories are visited. Every directory still costs
+    one stat, but unchanged ones skip the listing and all per-file work.
+    
+    Directory mtimes do not change when an existing file grows, so entries
+    older than max_age are walked again regardless.
+    
+    The whole file is read on every start, which is why max_entries
+    stays small (see SCAN_CACHE_MAX_ENTRIES for the size per entry).
+    """
+    
+    VERSION = 3
+    
+    def __init__(self, path: str, max_entries: int = SCAN_CACHE_MAX_ENTRIES,
+                 max_age: int = SCAN_CACHE_MAX_AGE):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # path -> [mtime_ns, inode, bytes, files, subdirs, walked_at, top_files, histogram]
+        self._touched = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'ScanCache':
+        """Load the cache from disk, starting empty if missing, unreadable or outdated"""
+        cache = cls(path, **kwargs)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == cls.VERSION:
+                cache._entries = data.get('entries', {})
+        except (OSError, ValueError, AttributeError):
+            pass
+        return cache
+    
+    def lookup(self, dirpath: str, st: os.stat_result) -> Optional[Tuple[int, int, List[str], list, list]]:
+        """
+        Return cached (bytes, files, subdir_names, top_files, histogram) if the directory is unchanged
+        
+        top_files holds [name, size] pairs of the largest files directly in
+        the directory, at most TOP_N_ENTRIES of them. histogram is
+        [sizes, hours] in the per-directory form of FileHistogram.add_dir().
+        """
+        entry = self._touched.get(dirpath) or self._entries.get(dirpath)
+        if (entry is None or entry[0] != st.st_mtime_ns or entry[1] != st.st_ino
+                or time.time() - entry[5] > self.max_age):
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        with self._lock:
+            self._touched[dirpath] = entry
+        return entry[2], entry[3], entry[4], entry[6], entry[7]
+    
+    def store(self, dirpath: str, st: os.stat_result, total_bytes: int, file_count: int,
+              subdir_names: List[str], top_files: list, histogram: list):
+        """Record the direct totals, largest files and histogram of a freshly walked directory"""
+        with self._lock:
+            self._touched[dirpath] = [st.st_mtime_ns, st.st_ino, total_bytes, file_count,
+                                      subdir_names, int(time.time()), top_files, histogram]
+    
+    def save(self):
+        """
+        Write the cache to disk atomically
+        
+        Keeps the max_entries most recently walked directories (this run's
+        entries replace those of older runs) and drops the rest, so the
+        file read on every start stays bounded however large a tree was.
+        """
+        with self._lock:
+            merged = dict(self._entries)
+            merged.update(self._touched)
+        if len(merged) > self.max_entries:
+            entries = dict(heapq.nlargest(self.max_entries, merged.items(),
+                                          key=lambda item: item[1][5]))
+        else:
+            entries = merged
+        
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'entries': entries}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Fehler beim Speichern des Scan-Cache: {e}")
+
+
+class PatternMatcher:
+    """
+    Compiled glob matcher for a location's 'patterns' field
+    
+    Patterns are relative to the location root and use '/' or '\' as
+    separator: 'iconcache_*.db' only matches files directly in the root,
+    'sub/*.tmp' files in 'sub', and '**' any number of directories. All
+    patterns are compiled into one case-insensitive regex for files, and
+    per-segment regexes let the walk prune directories no pattern can
+    reach. Matching uses '/'-separated paths relative to the root.
+    """
+    
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        self._segments = []  # per pattern: list of compiled segment regexes, None for '**'
+        file_regexes = []
+        
+        for pattern in self.patterns:
+            segments = [seg for seg in pattern.replace('\\', '/').split('/') if seg]
+            self._segments.append([
+                None if seg == '**' else re.compile(self._translate(seg), re.IGNORECASE)
+                for seg in segments
+            ])
+            
+            parts = []
+            for seg in segments[:-1]:
+                parts.append('(?:[^/]+/)*' if seg == '**' else self._translate(seg) + '/')
+            parts.append('.*' if segments[-1] == '**' else self._translate(segments[-1]))
+            file_regexes.append(''.join(parts))
+        
+        self._file_regex = re.compile(
+            '|'.join(f'(?:{regex})' for regex in file_regexes), re.IGNORECASE
+        )
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def for_patterns(cls, patterns: Tuple[str, ...]) -> 'PatternMatcher':
+        """Get the (shared) compiled matcher for a tuple of patterns"""
+        return cls(list(patterns))
+    
+    @staticmethod
+    def _translate(segment: str) -> str:
+        """Translate one glob path segment (*, ?, [...]) into a regex"""
+        regex = []
+        i = 0
+        while i < len(segment):
+            char = segment[i]
+            if char == '*':
+                regex.append('[^/]*')
+            elif char == '?':
+                regex.append('[^/]')
+            elif char == '[':
+                end = segment.find(']', i + 2)
+                if end == -1:
+                    regex.append(re.escape(char))
+                else:
+                    body = segment[i + 1:end].replace('\\', '\\\\')
+                    if body.startswith('!'):
+                        body = '^' + body[1:]
+                    regex.append(f'[{body}]')
+                    i = end
+            else:
+                regex.append(re.escape(char))
+            i += 1
+        return ''.join(regex)
+    
+    def match(self, relative_path: str) -> bool:
+        """Check a file path relative to the location root"""
+        return self._file_regex.fullmatch(relative_path) is not None
+    
+    def may_descend(self, relative_dir: str) -> bool:
+        """Check whether any pattern can match a file below this directory"""
+        dir_segments = relative_dir.split('/')
+        return any(self._prefix_matches(segments, dir_segments) for segments in self._segments)
+    
+    @staticmethod
+    def _prefix_matches(segments: list, dir_segments: List[str]) -> bool:
+        """Check whether a directory path can be the prefix of a path matching the pattern"""
+        for i, name in enumerate(dir_segments):
+            if i >= len(segments):
+                return False
+            if segments[i] is None:
+                return True  # '**' matches any remaining depth
+            if i == len(segments) - 1:
+                return False  # Last segment names the file, no deeper directories
+            if not segments[i].fullmatch(name):
+                return False
+        return True
+
+
+class FileFilter:
+    """
+    Predicate from a location's 'filter' field for selective cleanup
+    
+    Conditions (all optional):
+        min_age_days: Files last modified at least this many days ago
+        min_size_mb: Files of at least this size
+        combine: 'all' (default) requires both age and size conditions, 'any' either
+        include: Globs (PatternMatcher syntax, relative to the location root) a file must match
+        exclude: Globs a file must not match
+    
+    The predicate is evaluated on the size and mtime the walk already has
+    from the directory listing, so filtering costs no extra syscalls.
+    """
+    
+    FIELDS = ('min_age_days', 'min_size_mb', 'combine', 'include', 'exclude')
+    
+    def __init__(self, min_age_days: Optional[float] = None, min_size_mb: Optional[float] = None,
+                 combine: str = 'all', include: Tuple[str, ...] = (), exclude: Tuple[str, ...] = ()):
+        if combine not in ('all', 'any'):
+            raise ValueError(f"Ungültiger Filter-Modus: {combine}")
+        self.min_age_ns = int(min_age_days * 86400 * 1_000_000_000) if min_age_days is not None else None
+        self.min_size = int(min_size_mb * 1024 * 1024) if min_size_mb is not None else None
+        self.combine = combine
+        self.include = PatternMatcher.for_patterns(tuple(include)) if include else None
+        self.exclude = PatternMatcher.for_patterns(tuple(exclude)) if exclude else None
+    
+    @classmethod
+    def for_config(cls, config: dict) -> 'FileFilter':
+        """Get the (shared) filter for a location's 'filter' dictionary"""
+        unknown = set(config) - set(cls.FIELDS)
+        if unknown:
+            raise ValueError(f"Unbekannte Filterbedingung: {', '.join(sorted(unknown))}")
+        return cls._for_key(tuple(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in sorted(config.items())
+        ))
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _for_key(cls, key: tuple) -> 'FileFilter':
+        return cls(**dict(key))
+    
+    @property
+    def needs_path(self) -> bool:
+        """Whether the predicate looks at the relative path (include/exclude globs)"""
+        return self.include is not None or self.exclude is not None
+    
+    def may_descend(self, relative_dir: str) -> bool:
+        """Check whether files below this directory can pass the include globs"""
+        return self.include is None or self.include.may_descend(relative_dir)
+    
+    def bind(self, now: Optional[float] = None) -> Callable[[str, int, int], bool]:
+        """
+        Return the predicate test(relative_path, size, mtime_ns) for a scan or delete run
+        
+        Ages are measured against now (default: the current time).
+        """
+        cutoff_ns = None
+        if self.min_age_ns is not None:
+            cutoff_ns = int((time.time() if now is None else now) * 1_000_000_000) - self.min_age_ns
+        min_size = self.min_size
+        require_all = self.combine == 'all'
+        include = self.include
+        exclude = self.exclude
+        
+        def test(relative_path: str, size: int, mtime_ns: int) -> bool:
+            if include is not None and not include.match(relative_path):
+                return False
+            if exclude is not None and exclude.match(relative_path):
+                return False
+            if cutoff_ns is None and min_size is None:
+                return True
+            old = cutoff_ns is not None and mtime_ns <= cutoff_ns
+            large = min_size is not None and size >= min_size
+            if require_all:
+                return (old or cutoff_ns is None) and (large or min_size is None)
+            return old or large
+        
+        return test
+
+
+def normalize_path(path: str) -> str:
+    """Normalize a path for comparisons (absolute, normalized, case-folded on Windows)"""
+    return os.path.normcase(os.path.normpath(os.path.abspath(path)))
+
+
+class PathExclusions:
+    """
+    Paths inside a walk root that belong to another location
+    
+    Whole paths (directories or single files) are skipped entirely;
+    pattern exclusions skip only the files another location's
+    PatternMatcher claims below its root.
+    """
+    
+    def __init__(self):
+        self.paths = set()    # normalized paths skipped entirely
+        self._parents = set() # their parent directories (fast path for all other dirs)
+        self.patterns = []    # (normalized root, PatternMatcher)
+    
+    def __bool__(self) -> bool:
+        return bool(self.paths or self.patterns)
+    
+    def add_path(self, norm_path: str):
+        self.paths.add(norm_path)
+        self._parents.add(os.path.dirname(norm_path))
+    
+    def add_pattern(self, norm_root: str, matcher: PatternMatcher):
+        self.patterns.append((norm_root, matcher))
+    
+    def for_dir(self, dirpath: str) -> Optional[Callable[[str, bool], bool]]:
+        """
+        Get the skip check for the entries of one directory
+        
+        Returns:
+            skip(name, is_dir) -> bool, or None if nothing in this directory is excluded
+        """
+        norm_dir = normalize_path(dirpath)
+        check_paths = norm_dir in self._parents
+        matchers = []
+        for norm_root, matcher in self.patterns:
+            if norm_dir == norm_root:
+                matchers.append((matcher, ''))
+            elif norm_dir.startswith(norm_root + os.sep):
+                relative = norm_dir[len(norm_root) + 1:].replace(os.sep, '/')
+                matchers.append((matcher, relative + '/'))
+        
+        if not check_paths and not matchers:
+            return None
+        
+        def skip(name: str, is_dir: bool) -> bool:
+            if check_paths and os.path.join(norm_dir, os.path.normcase(name)) in self.paths:
+                return True
+            if not is_dir:
+                for matcher, prefix in matchers:
+                    if matcher.match(prefix + name):
+                        return True
+            return False
+        
+        return skip
+
+
+class OverlapIndex:
+    """
+    Index of identical and nested location roots
+    
+    Built once over all locations so every physical file is counted for
+    exactly one location. The most specific location owns a file:
+    
+    - Paths of a location nested in another of its own paths are dropped
+      (Recent + Recent\\AutomaticDestinations, CBS + CBS\\CBS.log)
+    - Identical roots without patterns: the first location owns the root,
+      later ones drop it
+    - A root nested in another location's root is excluded from the outer
+      walk; a pattern location (Icon Cache) only excludes its matching files
+      from the location sharing its root (Windows Explorer Thumbnails)
+    """
+    
+    def __init__(self, locations: List[Tuple[str, List[str], Optional[PatternMatcher]]]):
+        """
+        Args:
+            locations: (name, expanded paths, matcher or None) in configuration order
+        """
+        self._paths = {}       # name -> deduplicated paths
+        self._exclusions = {}  # (name, normalized root) -> PathExclusions
+        self.shared = {}       # name -> names of locations sharing its trees
+        
+        owners = {}  # normalized unpatterned root -> first owning location
+        roots = []   # (name, normalized root, matcher)
+        
+        for name, paths, matcher in locations:
+            norms = [normalize_path(p) for p in paths]
+            kept = []
+            for path, norm in zip(paths, norms):
+                if norm in [k for _, k in kept]:
+                    continue
+                # Root-relative patterns change meaning with the root, so only
+                # unpatterned paths are folded into an enclosing path
+                if matcher is None and any(self._is_nested(norm, other) for other in norms):
+                    continue
+                if matcher is None:
+                    owner = owners.setdefault(norm, name)
+                    if owner != name:
+                        self._mark_shared(name, owner)
+                        continue
+                kept.append((path, norm))
+            
+            self._paths[name] = [path for path, _ in kept]
+            roots.extend((name, norm, matcher) for _, norm in kept)
+        
+        for outer_name, outer_root, outer_matcher in roots:
+            for inner_name, inner_root, inner_matcher in roots:
+                if inner_name == outer_name:
+                    continue
+                
+                if inner_root == outer_root:
+                    # Same root: a pattern location claims its files from an
+                    # unpatterned one; between two pattern locations the first wins
+                    if inner_matcher is None:
+                        continue
+                    if outer_matcher is not None and self._order(roots, inner_name) > self._order(roots, outer_name):
+                        continue
+                    self._exclusions_for(outer_name, outer_root).add_pattern(inner_root, inner_matcher)
+                elif self._is_nested(inner_root, outer_root):
+                    if inner_matcher is None:
+                        self._exclusions_for(outer_name, outer_root).add_path(inner_root)
+                    else:
+                        self._exclusions_for(outer_name, outer_root).add_pattern(inner_root, inner_matcher)
+                else:
+                    continue
+                
+                self._mark_shared(outer_name, inner_name)
+    
+    @staticmethod
+    def _is_nested(path: str, parent: str) -> bool:
+        """Check whether normalized path lies strictly below normalized parent"""
+        return path.startswith(parent.rstrip(os.sep) + os.sep)
+    
+    @staticmethod
+    def _order(roots: list, name: str) -> int:
+        return next(i for i, root in enumerate(roots) if root[0] == name)
+    
+    def _exclusions_for(self, name: str, norm_root: str) -> PathExclusions:
+        return self._exclusions.setdefault((name, norm_root), PathExclusions())
+    
+    def _mark_shared(self, name: str, other: str):
+        self.shared.setdefault(name, set()).add(other)
+        self.shared.setdefault(other, set()).add(name)
+    
+    def paths_for(self, name: str, paths: List[str]) -> List[str]:
+        """Deduplicated paths of a location (unknown locations are returned unchanged)"""
+        return self._paths.get(name, paths)
+    
+    def exclusions_for(self, name: str, path: str) -> Optional[PathExclusions]:
+        """Paths below this root that belong to other locations (None if none)"""
+        return self._exclusions.get((name, normalize_path(path)))
+
+
+class RetryQueue:
+    """
+    Deferred retries for files that could not be removed on the first try
+    
+    Locked files are queued instead of being retried inline, so the walk
+    keeps deleting everything else. drain() then retries the whole queue
+    in batched passes with exponential backoff between them (base_delay,
+    doubled per pass up to DELETE_RETRY_MAX_DELAY) until every file is
+    gone or max_wait seconds have passed; max_attempts optionally stops
+    earlier (None = keep retrying until the deadline). The wait is bounded
+    per queue, not per file: 10,000 locked files cost at most max_wait
+    (plus the last pass), not 10,000 sleeps.
+    """
+    
+    def __init__(self, max_attempts: Optional[int] = None, max_wait: float = DELETE_RETRY_MAX_WAIT,
+                 base_delay: float = DELETE_RETRY_BASE_DELAY):
+        self.max_attempts = max_attempts
+        self.max_wait = max_wait
+        self.base_delay = base_delay
+        self._pending = []  # (path, size, last error)
+        self._lock = threading.Lock()
+    
+    def defer(self, path: str, size: int, error: OSError):
+        """Queue a file for the retry passes (thread-safe)"""
+        with self._lock:
+            self._pending.append((path, size, error))
+    
+    def __len__(self) -> int:
+        return len(self._pending)
+    
+    def drain(self, errors: ErrorCollector) -> Tuple[int, int]:
+        """
+        Retry all queued files
+        
+        Args:
+            errors: ErrorCollector that receives the files still failing at the end
+            
+        Returns:
+            Tuple of (deleted_files, freed_bytes)
+        """
+        deleted_files = 0
+        freed_bytes = 0
+        pending, self._pending = self._pending, []
+        deadline = time.monotonic() + self.max_wait
+        delay = self.base_delay
+        attempt = 1  # The failed removal during the walk
+        
+        while pending and (self.max_attempts is None or attempt < self.max_attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, DELETE_RETRY_MAX_DELAY)
+            attempt += 1
+            
+            still_failing = []
+            for path, size, error in pending:
+                try:
+                    os.remove(path)
+                    deleted_files += 1
+                    freed_bytes += size
+                except FileNotFoundError:
+                    pass  # Removed by someone else meanwhile
+                except OSError as e:
+                    still_failing.append((path, size, e))
+            pending = still_failing
+        
+        for path, _, error in pending:
+            errors.add('denied' if isinstance(error, PermissionError) else 'file', path, error)
+        return deleted_files, freed_bytes
+
+
+class VolumeLimiter:
+    """
+    Caps concurrent work per volume
+    
+    Volumes are told apart by st_dev (the volume serial number on
+    Windows), so caches on C: and on a second disk get separate slots
+    while locations on the same spindle do not thrash it. Paths whose
+    volume cannot be determined share one extra slot group.
+    """
+    
+    def __init__(self, per_volume: int = VOLUME_DELETE_CONCURRENCY):
+        self.per_volume = max(1, per_volume)
+        self._slots = {}  # st_dev or None -> BoundedSemaphore
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def device_of(paths: Iterable[str]) -> Optional[int]:
+        """st_dev of the first existing path, or None"""
+        for path in paths:
+            try:
+                return os.stat(path).st_dev
+            except OSError:
+                continue
+        return None
+    
+    def slot(self, device: Optional[int]) -> threading.BoundedSemaphore:
+        """Semaphore of a volume, use as 'with limiter.slot(device):'"""
+        with self._lock:
+            semaphore = self._slots.get(device)
+            if semaphore is None:
+                semaphore = self._slots[device] = threading.BoundedSemaphore(self.per_volume)
+            return semaphore
+
+
 class FileOperations:
     """File and directory operations with error handling"""
     
     @staticmethod
-    def delete_directory(path: str, max_retries: int = 3) -> Tuple[int, int, List[str]]:
+    def _remove_file(path: str, stat: Callable[[], os.stat_result], errors: ErrorCollector,
+                     retry: Optional[RetryQueue] = None) -> Optional[int]:
+        """
+        Remove one file, deferring locked files to a retry queue
+        
+        Args:
+            path: File to remove
+            stat: Returns the stat data used for the freed size (e.g. DirEntry.stat)
+            errors: ErrorCollector that receives the error if the file is not retried
+            retry: Optional RetryQueue for files that cannot be removed right now
+            
+        Returns:
+            Freed bytes, or None if the file was not removed (yet)
+        """
+        try:
+            file_size = stat().st_size
+        except FileNotFoundError:
+            return None  # File already deleted
+        except OSError as e:
+            errors.add('file', path, e)
+            return None
+        
+        try:
+            os.remove(path)
+            return file_size
+        except FileNotFoundError:
+            return None  # File already deleted
+        except OSError as e:
+            if retry is not None:
+                retry.defer(path, file_size, e)
+            else:
+                errors.add('denied' if isinstance(e, PermissionError) else 'file', path, e)
+            return None
+    
+    @staticmethod
+    def delete_directory(path: str, max_retries: Optional[int] = None, workers: int = 1,
+                         matcher: Optional[PatternMatcher] = None,
+                         exclusions: Optional[PathExclusions] = None,
+                         predicate: Optional[FileFilter] = None,
+                         retry_wait: float = DELETE_RETRY_MAX_WAIT,
+                         counters: Optional[List[int]] = None) -> Tuple[int, int, ErrorCollector]:
         """
         Delete directory contents with retry logic
         
+        Without matcher and predicate the whole subtree is reclaimable: files
+        are removed during the walk and every visited directory is then
+        removed bottom-up (see _remove_empty_dirs), leaving only the root.
+        
         Args:
             path: Directory path to delete
-            max_retries: Maximum number of retry attempts for locked files
+            max_retries: Optional cap on the attempts per locked file (None = retry
+                         until retry_wait is used up, see RetryQueue)
+            workers: Worker threads for large trees (see TreeWalker)
+            matcher: Optional PatternMatcher; only matching files are deleted and
+                     directories are left in place
+            exclusions: Optional PathExclusions owned by other locations (left untouched)
+            predicate: Optional FileFilter; only selected files are deleted and
+                       directories are left in place
+            retry_wait: Longest total wait in seconds for the retries of locked files
+            counters: [directories, stat_calls] list incremented by the walk (instrumentation)
             
         Returns:
             Tuple of (deleted_files, freed_bytes, errors)
         """
         deleted_files = 0
         freed_bytes = 0
-        errors = []
+        errors = ErrorCollector()
         
         if not os.path.exists(path):
-            errors.append(f"Pfad existiert nicht: {path}")
+            errors.add('missing', path)
             return deleted_files, freed_bytes, errors
         
         # Handle single file
         if os.path.isfile(path):
+            if matcher is not None and not matcher.match(os.path.basename(path)):
+                return deleted_files, freed_bytes, errors
             try:
-                file_size = os.path.getsize(path)
+                st = os.stat(path)
+                if predicate is not None and not predicate.bind()(
+                        os.path.basename(path), st.st_size, st.st_mtime_ns):
+                    return deleted_files, freed_bytes, errors
+                file_size = st.st_size
                 os.remove(path)
                 deleted_files = 1
                 freed_bytes = file_size
                 return deleted_files, freed_bytes, errors
             except Exception as e:
-                errors.append(f"Fehler bei {path}: {str(e)}")
+                errors.add('file', path, e)
                 return deleted_files, freed_bytes, errors
         
-        # Handle directory
-        try:
-            for dirpath, dirnames, filenames in os.walk(path, topdown=False):
-                # Delete files
-                for filename in filenames:
-                    file_path = os.path.join(dirpath, filename)
-                    
-                    for attempt in range(max_retries):
-                        try:
-                            file_size = os.path.getsize(file_path)
-                            os.remove(file_path)
-                            deleted_files += 1
-                            freed_bytes += file_size
-                            break  # Success, exit retry loop
-                            
-                        except PermissionError:
-                            if attempt < max_retries - 1:
-                                time.sleep(0.1)  # Wait a bit before retry
-                            else:
-                                errors.append(f"Zugriff verweigert: {file_path}")
-                                
-                        except FileNotFoundError:
-                            break  # File already deleted
-                            
-                        except Exception as e:
-                            if attempt < max_retries - 1:
-                                time.sleep(0.1)
-                            else:
-                                errors.append(f"Fehler bei {file_path}: {str(e)}")
+        root_len = len(os.path.join(path, ''))
+        retry = RetryQueue(max_retries, retry_wait)
+        test = predicate.bind() if predicate is not None else None
+        needs_rel = matcher is not None or (predicate is not None and predicate.needs_path)
+        
+        def visit(dirpath: str, acc: list) -> List[str]:
+            # acc: [deleted_files, freed_bytes, errors, visited_dirs, directories, stat_calls]
+            acc[4] += 1
+            subdirs = []
+            try:
+                with os.scandir(dirpath) as entries:
+                    entries = list(entries)
+            except OSError as e:
+                acc[2].add('walk', dirpath, e)
+                return subdirs
+            
+            rel_prefix = FileOperations._relative_prefix(dirpath, root_len) if needs_rel else ''
+            skip = exclusions.for_dir(dirpath) if exclusions else None
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                    if skip is not None and skip(entry.name, is_dir):
+                        continue
+                    if is_dir:
+                        if not entry.is_symlink() and (
+                                matcher is None or matcher.may_descend(rel_prefix + entry.name)) and (
+                                predicate is None or predicate.may_descend(rel_prefix + entry.name)):
+                            subdirs.append(entry.path)
+                        continue
+                except OSError:
+                    pass
+                
+                if matcher is not None and not matcher.match(rel_prefix + entry.name):
+                    continue
                 
-                # Delete empty directories
-                for dirname in dirnames:
-                    dir_path = os.path.join(dirpath, dirname)
+                acc[5] += 1  # DirEntry.stat below, cached per entry
+                if test is not None:
+                    # DirEntry caches the stat data, _remove_file reuses it
                     try:
-                        if not os.listdir(dir_path):  # Only if empty
-                            os.rmdir(dir_path)
-                    except (OSError, PermissionError):
-                        pass  # Ignore errors for directories
-                        
-        except Exception as e:
-            errors.append(f"Fehler beim Durchlaufen von {path}: {str(e)}")
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    if not test(rel_prefix + entry.name, st.st_size, st.st_mtime_ns):
+                        continue
+                
+                freed = FileOperations._remove_file(entry.path, entry.stat, acc[2], retry)
+                if freed is not None:
+                    acc[0] += 1
+                    acc[1] += freed
+            
+            if matcher is None and predicate is None:
+                acc[3].extend(subdirs)
+            return subdirs
+        
+        accs = TreeWalker(workers).walk(path, visit, lambda: [0, 0, ErrorCollector(), [], 0, 0])
+        
+        visited_dirs = []
+        for acc in accs:
+            deleted_files += acc[0]
+            freed_bytes += acc[1]
+            errors.extend(acc[2])
+            visited_dirs.extend(acc[3])
+            if counters is not None:
+                counters[0] += acc[4]
+                counters[1] += acc[5]
+        
+        # Locked files are retried once the rest of the tree is gone
+        deleted, freed = retry.drain(errors)
+        deleted_files += deleted
+        freed_bytes += freed
+        
+        # Bulk mode only: visited_dirs stays empty when files are selected
+        FileOperations._remove_empty_dirs(visited_dirs)
         
         return deleted_files, freed_bytes, errors
     
     @staticmethod
-    def get_directory_size(path: str) -> Tuple[int, int, List[str]]:
+    def _relative_prefix(dirpath: str, root_len: int) -> str:
+        """'/'-separated path of dirpath below the walk root, with trailing '/' (PatternMatcher format)"""
+        relative = dirpath[root_len:]
+        if not relative:
+            return ''
+        if os.sep != '/':
+            relative = relative.replace(os.sep, '/')
+        return relative + '/'
+    
+    @staticmethod
+    def _remove_empty_dirs(dirs: List[str]) -> int:
+        """
+        Remove the given directories bottom-up, deepest first (a child path is always longer)
+        
+        os.rmdir itself refuses directories that are not empty, so there is
+        no listdir recheck: an empty directory costs one syscall, a directory
+        still holding files (locked, excluded, not selected) one failed one.
+        
+        Returns:
+            Number of directories removed
+        """
+        removed = 0
+        for dir_path in sorted(dirs, key=len, reverse=True):
+            try:
+                os.rmdir(dir_path)
+                removed += 1
+            except OSError:
+                pass  # Not empty or not accessible, left in place
+        return removed
+    
+    @staticmethod
+    def delete_from_inventory(inventory: FileInventory, max_retries: Optional[int] = None,
+                              retry_wait: float = DELETE_RETRY_MAX_WAIT,
+                              counters: Optional[List[int]] = None) -> Tuple[int, int, ErrorCollector]:
+        """
+        Delete the files recorded during the scan without walking the tree again
+        
+        Files whose size or modification time changed since the scan are
+        skipped (and counted as 'changed' errors), files that no longer
+        exist are ignored.
+        
+        Args:
+            inventory: Inventory filled by get_directory_size
+            max_retries: Optional cap on the attempts per locked file (None = retry
+                         until retry_wait is used up, see RetryQueue)
+            retry_wait: Longest total wait in seconds for the retries of locked files
+            counters: [directories, stat_calls] list incremented (instrumentation)
+            
+        Returns:
+            Tuple of (deleted_files, freed_bytes, errors)
+        """
+        deleted_files = 0
+        freed_bytes = 0
+        errors = ErrorCollector()
+        retry = RetryQueue(max_retries, retry_wait)
+        stat_calls = 0
+        
+        for path, size, mtime_ns in inventory:
+            stat_calls += 1
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue  # Already gone
+            except OSError as e:
+                errors.add('file', path, e)
+                continue
+            
+            if st.st_size != size or st.st_mtime_ns != mtime_ns:
+                errors.add('changed', path)
+                continue
+            
+            freed = FileOperations._remove_file(path, lambda: st, errors, retry)
+            if freed is not None:
+                deleted_files += 1
+                freed_bytes += freed
+        
+        deleted, freed = retry.drain(errors)
+        deleted_files += deleted
+        freed_bytes += freed
+        
+        FileOperations._remove_empty_dirs(inventory.dirs)
+        if counters is not None:
+            counters[0] += len(inventory.dirs)
+            counters[1] += stat_calls
+        
+        return deleted_files, freed_bytes, errors
+    
+    @staticmethod
+    def get_directory_size(path: str, workers: int = 1,
+                           inventory: Optional[FileInventory] = None,
+                           cache: Optional[ScanCache] = None,
+                           matcher: Optional[PatternMatcher] = None,
+                           exclusions: Optional[PathExclusions] = None,
+                           top: Optional[LargestEntries] = None,
+                           histogram: Optional[FileHistogram] = None,
+                           predicate: Optional[FileFilter] = None,
+                           reclaimable: Optional[List[int]] = None,
+                           counters: Optional[List[int]] = None) -> Tuple[int, int, ErrorCollector]:
         """
         Calculate directory size
         
+        Uses os.scandir with an explicit stack instead of os.walk, so file
+        sizes come from the DirEntry stat data (cached by the directory
+        listing on Windows) instead of a second os.path.getsize call per file.
+        
         Args:
             path: Directory path to calculate
+            workers: Worker threads for large trees (see TreeWalker)
+            inventory: Optional FileInventory that records every file for the delete phase
+            cache: Optional ScanCache; unchanged directories reuse their cached totals.
+                   Directories are only served from the cache when no inventory is
+                   requested, since the inventory needs every file.
+            matcher: Optional PatternMatcher; only matching files are counted and
+                     directories no pattern can reach are not entered
+            exclusions: Optional PathExclusions owned by other locations (see OverlapIndex)
+            top: Optional LargestEntries that collects the largest files and directories
+            histogram: Optional FileHistogram that collects the size and age distribution
+            predicate: Optional FileFilter selecting the files a cleanup would delete.
+                       All files are still counted; only selected files go into the
+                       inventory, and their totals are added to reclaimable.
+            reclaimable: [bytes, files] list incremented by the files predicate selects
+            counters: [directories, stat_calls] list incremented by the walk (instrumentation)
             
         Returns:
             Tuple of (total_bytes, file_count, errors)
         """
         total_size = 0
         file_count = 0
-        errors = []
+        errors = ErrorCollector()
         
         if not os.path.exists(path):
             return total_size, file_count, errors
         
         # Handle single file
         if os.path.isfile(path):
+            if matcher is not None and not matcher.match(os.path.basename(path)):
+                return total_size, file_count, errors
             try:
-                return os.path.getsize(path), 1, errors
+                st = os.stat(path)
+                selected = predicate is None or predicate.bind()(
+                    os.path.basename(path), st.st_size, st.st_mtime_ns)
+                if predicate is not None and selected and reclaimable is not None:
+                    reclaimable[0] += st.st_size
+                    reclaimable[1] += 1
+                if inventory is not None and selected:
+                    inventory.add_files([(path, st.st_size, st.st_mtime_ns)])
+                if top is not None:
+                    top.add_file(path, st.st_size)
+                if histogram is not None:
+                    histogram.add_file(st.st_size, st.st_mtime_ns)
+                return st.st_size, 1, errors
             except Exception as e:
-                errors.append(f"Fehler bei {path}: {str(e)}")
+                errors.add('file', path, e)
                 return 0, 0, errors
         
-        # Handle directory
-        try:
-            for dirpath, dirnames, filenames in os.walk(path):
-                for filename in filenames:
-                    file_path = os.path.join(dirpath, filename)
-                    try:
-                        total_size += os.path.getsize(file_path)
-                        file_count += 1
-                    except (OSError, PermissionError) as e:
-                        errors.append(f"Fehler bei {file_path}: {str(e)}")
-                        
-        except (OSError, PermissionError) as e:
-            errors.append(f"Fehler beim Zugriff auf {path}: {str(e)}")
+        # Cached totals cover all files and do not know the predicate,
+        # so they cannot serve a filtered scan. They hold no file list
+        # either, so an inventory scan would only pay for the extra stat
+        # and the top/histogram tracking without ever getting a hit.
+        if matcher is not None or predicate is not None or inventory is not None:
+            cache = None
+        root_len = len(os.path.join(path, ''))
+        test = predicate.bind(histogram.now if histogram is not None else None) if predicate else None
+        needs_rel = matcher is not None or (predicate is not None and predicate.needs_path)
+        # The cache keeps the largest direct files and the histogram of each
+        # directory even when this scan does not ask for them, so later scans
+        # can serve them from cached directories
+        top_limit = top.limit if top is not None else TOP_N_ENTRIES
+        track_top = top is not None or cache is not None
+        track_hist = histogram is not None or cache is not None
+        scan_now = histogram.now if histogram is not None else time.time()
+        cutoff_hour = FileHistogram(scan_now).cutoff_hour
+        size_bucket = FileHistogram.size_bucket
+        
+        def visit(dirpath: str, acc: list) -> List[str]:
+            # acc: [total_size, file_count, errors, LargestEntries or None, FileHistogram or None,
+            #       reclaimable_bytes, reclaimable_files, directories, stat_calls]
+            skip = exclusions.for_dir(dirpath) if exclusions else None
+            dir_stat = None
+            acc[7] += 1
+            # Cached totals include excluded entries, so such directories bypass the cache
+            if cache is not None and skip is None:
+                acc[8] += 1
+                try:
+                    dir_stat = os.stat(dirpath)
+                except OSError:
+                    pass
+                if dir_stat is not None:
+                    cached = cache.lookup(dirpath, dir_stat)
+                    if cached is not None:
+                        acc[0] += cached[0]
+                        acc[1] += cached[1]
+                        if acc[3] is not None:
+                            for name, size in cached[3]:
+                                acc[3].add_file(os.path.join(dirpath, name), size)
+                            acc[3].add_dir(dirpath, cached[0], cached[1])
+                        if acc[4] is not None:
+                            acc[4].add_dir(*cached[4])
+                        return [os.path.join(dirpath, name) for name in cached[2]]
+            
+            subdirs = []
+            subdir_names = []
+            dir_bytes = 0
+            dir_files = 0
+            error_count = len(acc[2])
+            records = [] if inventory is not None else None
+            dir_top = []  # min-heap of (size, name) of the largest direct files
+            dir_sizes = [0] * (2 * len(FileHistogram.SIZE_LABELS))  # count, bytes per bucket
+            dir_hours = {}  # mtime hour -> [count, bytes]
+            rel_prefix = FileOperations._relative_prefix(dirpath, root_len) if needs_rel else ''
+            try:
+                with os.scandir(dirpath) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir()
+                            if skip is not None and skip(entry.name, is_dir):
+                                continue
+                            if is_dir:
+                                # Like os.walk: never descend into symlinked directories
+                                if not entry.is_symlink() and (
+                                        matcher is None or matcher.may_descend(rel_prefix + entry.name)):
+                                    subdirs.append(entry.path)
+                                    subdir_names.append(entry.name)
+                                continue
+                            if matcher is not None and not matcher.match(rel_prefix + entry.name):
+                                continue
+                            st = entry.stat()
+                            dir_bytes += st.st_size
+                            dir_files += 1
+                            if track_top:
+                                if len(dir_top) < top_limit:
+                                    heapq.heappush(dir_top, (st.st_size, entry.name))
+                                elif st.st_size > dir_top[0][0]:
+                                    heapq.heapreplace(dir_top, (st.st_size, entry.name))
+                            if track_hist:
+                                bucket = 2 * size_bucket(st.st_size)
+                                dir_sizes[bucket] += 1
+                                dir_sizes[bucket + 1] += st.st_size
+                                hour = st.st_mtime_ns // HOUR_NS
+                                if hour < cutoff_hour:
+                                    hour = 0
+                                counts = dir_hours.get(hour)
+                                if counts is None:
+                                    dir_hours[hour] = [1, st.st_size]
+                                else:
+                                    counts[0] += 1
+                                    counts[1] += st.st_size
+                            if test is not None:
+                                if not test(rel_prefix + entry.name, st.st_size, st.st_mtime_ns):
+                                    continue
+                                acc[5] += st.st_size
+                                acc[6] += 1
+                            if records is not None:
+                                records.append((entry.path, st.st_size, st.st_mtime_ns))
+                        except OSError as e:
+                            acc[2].add('file', entry.path, e)
+            except OSError as e:
+                acc[2].add('dir', dirpath, e)
+            
+            acc[0] += dir_bytes
+            acc[1] += dir_files
+            acc[8] += dir_files
+            if acc[3] is not None:
+                for size, name in dir_top:
+                    acc[3].add_file(os.path.join(dirpath, name), size)
+                acc[3].add_dir(dirpath, dir_bytes, dir_files)
+            sizes = [[i >> 1, dir_sizes[i], dir_sizes[i + 1]]
+                     for i in range(0, len(dir_sizes), 2) if dir_sizes[i]]
+            hours = [[hour, counts[0], counts[1]] for hour, counts in dir_hours.items()]
+            if acc[4] is not None:
+                acc[4].add_dir(sizes, hours)
+            if records is not None:
+                inventory.add_files(records)
+                # Pattern and filter scans only own the selected files, never the directories
+                if matcher is None and predicate is None:
+                    inventory.add_dirs(subdirs)
+            # Incomplete listings are never cached
+            if dir_stat is not None and len(acc[2]) == error_count:
+                cache.store(dirpath, dir_stat, dir_bytes, dir_files, subdir_names,
+                            [[name, size] for size, name in dir_top], [sizes, hours])
+            return subdirs
+        
+        def make_acc() -> list:
+            return [0, 0, ErrorCollector(), LargestEntries(top_limit) if top is not None else None,
+                    FileHistogram(scan_now) if histogram is not None else None, 0, 0, 0, 0]
+        
+        for acc in TreeWalker(workers).walk(path, visit, make_acc):
+            total_size += acc[0]
+            file_count += acc[1]
+            errors.extend(acc[2])
+            if top is not None:
+                top.merge(acc[3])
+            if histogram is not None:
+                histogram.merge(acc[4])
+            if reclaimable is not None:
+                reclaimable[0] += acc[5]
+                reclaimable[1] += acc[6]
+            if counters is not None:
+                counters[0] += acc[7]
+                counters[1] += acc[8]
         
         return total_size, file_count, errors
     
@@ -371,11 +1914,8 @@ class DISMOperations:
             Dictionary with analysis results or None on error
         """
         try:
-            result = subprocess.run(
+            result = command_runner.run(
                 ['Dism.exe', '/online', '/Cleanup-Image', '/AnalyzeComponentStore'],
-                capture_output=True,
-                text=True,
-                check=False,
                 timeout=300  # 5 minutes timeout
             )
             
@@ -404,39 +1944,68 @@ class DISMOperations:
             return None
     
     @staticmethod
-    def cleanup_component_store(reset_base: bool = False) -> Tuple[bool, str]:
+    def cleanup_component_store(reset_base: bool = False,
+                                on_line: Optional[Callable[[str], None]] = None) -> Tuple[bool, str]:
         """
         Clean up WinSxS component store
         
         Args:
             reset_base: If True, use /ResetBase (more aggressive, removes ability to uninstall updates)
+            on_line: Called with every DISM output line (progress) as it arrives
             
         Returns:
             Tuple of (success, message)
         """
-        try:
-            cmd = ['Dism.exe', '/online', '/Cleanup-Image', '/StartComponentCleanup']
-            
-            if reset_base:
-                cmd.append('/ResetBase')
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=False,
-                timeout=600  # 10 minutes timeout
-            )
-            
-            if result.returncode == 0:
-                return True, "WinSxS Cleanup erfolgreich"
-            else:
-                return False, f"DISM Fehler: {result.stderr}"
-                
-        except subprocess.TimeoutExpired:
-            return False, "DISM Timeout (>10 Minuten)"
-        except Exception as e:
-            return False, f"DISM Exception: {str(e)}"
+        return DISMOperations.start_component_cleanup(reset_base, on_line).result()
+    
+    @staticmethod
+    def start_component_cleanup(reset_base: bool = False,
+                                on_line: Optional[Callable[[str], None]] = None) -> concurrent.futures.Future:
+        """
+        Start the WinSxS cleanup in the background
+        
+        File deletion can continue while DISM runs; cancelling the returned
+        Future kills the DISM process.
+        
+        Returns:
+            Future resolving to (success, message)
+        """
+        cmd = ['Dism.exe', '/online', '/Cleanup-Image', '/StartComponentCleanup']
+        
+        if reset_base:
+            cmd.append('/ResetBase')
+        
+        outcome = concurrent.futures.Future()
+        command = command_runner.submit(
+            cmd,
+            timeout=600,  # 10 minutes timeout
+            on_line=on_line
+        )
+        
+        def translate(done: concurrent.futures.Future):
+            if done.cancelled():
+                outcome.cancel()
+                return
+            try:
+                result = done.result()
+                if result.returncode == 0:
+                    message = (True, "WinSxS Cleanup erfolgreich")
+                else:
+                    message = (False, f"DISM Fehler: {result.stderr}")
+            except subprocess.TimeoutExpired:
+                message = (False, "DISM Timeout (>10 Minuten)")
+            except Exception as e:
+                message = (False, f"DISM Exception: {str(e)}")
+            if outcome.set_running_or_notify_cancel():
+                outcome.set_result(message)
+        
+        def propagate_cancel(done: concurrent.futures.Future):
+            if done.cancelled():
+                command.cancel()
+        
+        outcome.add_done_callback(propagate_cancel)
+        command.add_done_callback(translate)
+        return outcome
 
 
 def format_size(bytes_size: int) -> str:
@@ -446,32 +2015,3 @@ def format_size(bytes_size: int) -> str:
             return f"{bytes_size:.2f} {unit}"
         bytes_size /= 1024.0
     return f"{bytes_size:.2f} PB"
-
-
-def confirm_action(prompt: str, default: bool = False) -> bool:
-    """
-    Ask user for confirmation
-    
-    Args:
-        prompt: Question to ask
-        default: Default answer if user just presses Enter
-        
-    Returns:
-        True if user confirms, False otherwise
-    """
-    yes_choices = ['ja', 'j', 'yes', 'y']
-    no_choices = ['nein', 'n', 'no']
-    
-    default_str = " [Ja/nein]" if default else " [ja/Nein]"
-    
-    while True:
-        response = input(prompt + default_str + ": ").strip().lower()
-        
-        if response == '':
-            return default
-        elif response in yes_choices:
-            return True
-        elif response in no_choices:
-            return False
-        else:
-            print("Bitte 'ja' oder 'nein' eingeben.")
\ No newline at end of file